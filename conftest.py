@@ -0,0 +1,24 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def temp_media(settings, tmp_path):
+    """Картинки и миниатюры тестов пишутся во временный каталог."""
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    # Поток пула открыл бы своё соединение с тестовой базой в памяти
+    # и блокировал её таблицы, поэтому миниатюры делаются сразу.
+    settings.POSTS_THUMBNAIL_ASYNC = False
+
+
+@pytest.fixture(autouse=True)
+def temp_metrics(settings, tmp_path):
+    """Метрики тестов не смешиваются с метриками работающего сервера.
+
+    Прогон manage.py test делает то же в core.test_runner.TestRunner.
+    """
+    from core import metrics
+
+    settings.METRICS_DIR = str(tmp_path / 'metrics')
+    metrics.reset()
+    yield
+    metrics.reset()
@@ -0,0 +1,164 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Group, Post
+from posts.paginators import encode_cursor
+
+from .views import POST_FIELDS
+
+User = get_user_model()
+POSTS_COUNT = 7
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="egor")
+        cls.other = User.objects.create_user(username="other")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug",
+            description="Тестовое описание",
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f"Пост {i}", group=cls.group)
+            for i in range(POSTS_COUNT)
+        )
+        cls.post = Post.objects.create(author=cls.other, text="Чужой пост")
+        Comment.objects.create(post=cls.post, author=cls.author, text="Да")
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f"api:{name}", args=args), params)
+
+    def walk(self, name, *args, **params):
+        """Собирает id всех строк, переходя по ссылкам next."""
+        seen = []
+        response = self.get(name, *args, **params)
+        while True:
+            data = response.json()
+            seen.extend(row["id"] for row in data["results"])
+            if data["next"] is None:
+                return seen
+            response = self.client.get(data["next"])
+
+    def test_cursor_walk_returns_every_post_once(self):
+        """Курсор API проходит ленту по порядку и без повторов"""
+        expected = list(
+            Post.objects.order_by("-pub_date", "-pk")
+            .values_list("pk", flat=True)
+        )
+        self.assertEqual(self.walk("post_list", limit=3), expected)
+        self.assertEqual(
+            self.walk("group_posts", self.group.slug, limit=3),
+            [pk for pk in expected if pk != self.post.pk],
+        )
+        self.assertEqual(
+            self.walk("profile_posts", self.other.username), [self.post.pk]
+        )
+
+    def test_sparse_fields(self):
+        """?fields= отдаёт только выбранные поля и не делает JOIN"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get("post_list", fields="id,text")
+        self.assertEqual(
+            set(response.json()["results"][0]), {"id", "text"}
+        )
+        self.assertNotIn("JOIN", queries[-1]["sql"])
+        full = self.get("post_detail", self.post.pk).json()
+        self.assertEqual(set(full), set(POST_FIELDS))
+        self.assertEqual(full["author"], self.other.username)
+        self.assertIsNone(full["group"])
+
+    def test_unknown_field_and_missing_objects(self):
+        """Неизвестное поле — 400, несуществующий объект — 404"""
+        response = self.get("post_list", fields="id,password")
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        self.assertIn("password", response.json()["detail"])
+        for name, arg in (("post_detail", 0), ("comment_list", 0),
+                          ("group_posts", "missing"),
+                          ("profile", "missing"),
+                          ("profile_posts", "missing")):
+            with self.subTest(name=name):
+                self.assertEqual(
+                    self.get(name, arg).status_code, HTTPStatus.NOT_FOUND
+                )
+
+    def test_malformed_cursor(self):
+        """Курсор не того типа или испорченный — 400"""
+        cases = (
+            ("post_list", {"after": encode_cursor(1.5, 3)}),
+            ("post_list", {"before": "broken"}),
+            ("group_list", {"after": encode_cursor(timezone.now(), 3)}),
+        )
+        for name, params in cases:
+            with self.subTest(name=name, params=params):
+                response = self.get(name, **params)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.BAD_REQUEST
+                )
+                self.assertIn("detail", response.json())
+
+    def test_comments_groups_and_profile(self):
+        """Комментарии, группы и профиль отдаются в JSON"""
+        comments = self.get("comment_list", self.post.pk).json()["results"]
+        self.assertEqual(
+            [(row["author"], row["text"]) for row in comments],
+            [(self.author.username, "Да")],
+        )
+        groups = self.get("group_list").json()["results"]
+        self.assertEqual([row["slug"] for row in groups], [self.group.slug])
+        # Посты egor созданы bulk_create, счётчики есть только у other.
+        profile = self.get("profile", self.other.username).json()
+        self.assertEqual(profile["posts_count"], 1)
+
+    def test_new_comment_updates_lists(self):
+        """Новый комментарий меняет comments_count в списках постов"""
+        post = Post.objects.filter(author=self.author).first()
+        lists = (("post_list", ()), ("group_posts", (self.group.slug,)),
+                 ("profile_posts", (self.author.username,)))
+        etags = {name: self.get(name, *args)["ETag"] for name, args in lists}
+        Comment.objects.create(post=post, author=self.other, text="Ещё")
+        for name, args in lists:
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse(f"api:{name}", args=args),
+                    HTTP_IF_NONE_MATCH=etags[name],
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                counts = {
+                    row["id"]: row["comments_count"]
+                    for row in response.json()["results"]
+                }
+                self.assertEqual(counts[post.pk], 1)
+        # HTML-ленты комментариев не показывают и остаются в кеше.
+        self.client.get(reverse("posts:index"))
+        Comment.objects.create(post=post, author=self.other, text="Ещё раз")
+        self.assertIsNone(self.client.get(reverse("posts:index")).context)
+
+    def test_single_query_per_page(self):
+        """Страница ленты — один запрос к базе"""
+        for name, args in (("post_list", ()),
+                           ("group_posts", (self.group.slug,)),
+                           ("profile_posts", (self.author.username,))):
+            with self.subTest(name=name):
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.get(name, *args)
+                self.assertEqual(len(queries), 1)
+
+    def test_only_get_allowed(self):
+        """API только читает данные"""
+        response = self.client.post(reverse("api:post_list"))
+        self.assertEqual(response.status_code,
+                         HTTPStatus.METHOD_NOT_ALLOWED)
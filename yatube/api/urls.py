@@ -0,0 +1,18 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.post_list, name='post_list'),
+    path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/', views.comment_list,
+         name='comment_list'),
+    path('groups/', views.group_list, name='group_list'),
+    path('groups/<slug:slug>/posts/', views.group_posts,
+         name='group_posts'),
+    path('profiles/<str:username>/', views.profile, name='profile'),
+    path('profiles/<str:username>/posts/', views.profile_posts,
+         name='profile_posts'),
+]
@@ -0,0 +1,211 @@
+from functools import wraps
+
+from django.core.paginator import InvalidPage
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+
+from posts.caching import cache_page_versioned, condition_versioned
+from posts.models import Comment, Group, Post, User
+from posts.paginators import CursorPaginator
+from posts.views import (CACHE_TIMEOUT, GROUP_SCOPES, INDEX_SCOPES,
+                         POST_SCOPES, PROFILE_SCOPES)
+
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# В списках постов есть comments_count, поэтому они сбрасываются
+# и от новых комментариев (область 'comments').
+POST_LIST_SCOPES = (*INDEX_SCOPES, "comments")
+GROUP_POSTS_SCOPES = (*GROUP_SCOPES, "comments")
+PROFILE_POSTS_SCOPES = (*PROFILE_SCOPES, "comments")
+
+# Имя поля в ответе и путь к нему для values(): связанные строки
+# приходят тем же запросом через JOIN, объекты моделей не создаются.
+POST_FIELDS = {
+    "id": "id",
+    "text": "text",
+    "pub_date": "pub_date",
+    "updated": "updated",
+    "author": "author__username",
+    "group": "group__slug",
+    "image": "image",
+    "comments_count": "comments_count",
+}
+COMMENT_FIELDS = {
+    "id": "id",
+    "post": "post_id",
+    "text": "text",
+    "created": "created",
+    "author": "author__username",
+}
+GROUP_FIELDS = {
+    "id": "id",
+    "slug": "slug",
+    "title": "title",
+    "description": "description",
+}
+PROFILE_FIELDS = {
+    "username": "username",
+    "first_name": "first_name",
+    "last_name": "last_name",
+    "posts_count": "stats__posts_count",
+    "followers_count": "stats__followers_count",
+    "following_count": "stats__following_count",
+}
+
+
+def image_url(name):
+    return Post._meta.get_field("image").storage.url(name) if name else None
+
+
+CONVERTERS = {"image": image_url}
+
+
+class ApiError(Exception):
+    def __init__(self, status, detail):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+
+def api_view(key_prefix, scopes):
+    """Только GET, ошибки в JSON, кеш и 304 как у HTML-страниц."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            try:
+                return view(request, *args, **kwargs)
+            except ApiError as error:
+                return json_response({"detail": error.detail}, error.status)
+        cached = cache_page_versioned(
+            CACHE_TIMEOUT, f"api_{key_prefix}", scopes
+        )(require_GET(wrapper))
+        return condition_versioned(f"api_{key_prefix}", scopes)(cached)
+    return decorator
+
+
+def json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, json_dumps_params={"ensure_ascii": False}
+    )
+
+
+def selected_fields(request, fields):
+    """Поля из ?fields=a,b; без параметра — все поля."""
+    names = [
+        name.strip() for name in request.GET.get("fields", "").split(",")
+        if name.strip()
+    ]
+    unknown = sorted(set(names) - set(fields))
+    if unknown:
+        raise ApiError(400, f"Неизвестные поля: {', '.join(unknown)}")
+    return names or list(fields)
+
+
+def page_size(request):
+    try:
+        size = int(request.GET.get("limit", PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+    return min(max(size, 1), MAX_PAGE_SIZE)
+
+
+def serialize(row, fields, names):
+    return {
+        name: CONVERTERS.get(name, lambda value: value)(row[fields[name]])
+        for name in names
+    }
+
+
+def page_link(request, name, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    for key in ("after", "before", "page"):
+        params.pop(key, None)
+    params[name] = cursor
+    return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+
+def page_response(request, queryset, fields, field="pub_date", missing=None):
+    """Страница строк values() по курсору.
+
+    missing — функция, которая проверяет родительскую запись, если
+    страница пуста: так на существующий объект уходит один запрос.
+    """
+    names = selected_fields(request, fields)
+    lookups = {fields[name] for name in names} | {field, "id"}
+    try:
+        page = CursorPaginator(
+            queryset.values(*lookups), page_size(request),
+            field=field, pk_field="id",
+        ).cursor_page(request.GET)
+    except InvalidPage as error:
+        raise ApiError(400, str(error))
+    if not page.object_list and missing is not None and missing():
+        raise ApiError(404, "Не найдено")
+    return json_response({
+        "results": [serialize(row, fields, names) for row in page],
+        "next": page_link(request, "after", page.next_cursor),
+        "previous": page_link(request, "before", page.previous_cursor),
+    })
+
+
+def object_response(request, queryset, fields):
+    names = selected_fields(request, fields)
+    row = queryset.values(*{fields[name] for name in names}).first()
+    if row is None:
+        raise ApiError(404, "Не найдено")
+    return json_response(serialize(row, fields, names))
+
+
+@api_view("post_list", POST_LIST_SCOPES)
+def post_list(request):
+    return page_response(request, Post.objects.all(), POST_FIELDS)
+
+
+@api_view("post_detail", POST_SCOPES)
+def post_detail(request, post_id):
+    return object_response(
+        request, Post.objects.filter(pk=post_id), POST_FIELDS
+    )
+
+
+@api_view("comment_list", ("post:{post_id}",))
+def comment_list(request, post_id):
+    return page_response(
+        request, Comment.objects.filter(post_id=post_id), COMMENT_FIELDS,
+        field="created",
+        missing=lambda: not Post.objects.filter(pk=post_id).exists(),
+    )
+
+
+@api_view("group_list", ("groups",))
+def group_list(request):
+    return page_response(
+        request, Group.objects.all(), GROUP_FIELDS, field="id"
+    )
+
+
+@api_view("group_posts", GROUP_POSTS_SCOPES)
+def group_posts(request, slug):
+    return page_response(
+        request, Post.objects.filter(group__slug=slug), POST_FIELDS,
+        missing=lambda: not Group.objects.filter(slug=slug).exists(),
+    )
+
+
+@api_view("profile", PROFILE_SCOPES)
+def profile(request, username):
+    return object_response(
+        request, User.objects.filter(username=username), PROFILE_FIELDS
+    )
+
+
+@api_view("profile_posts", PROFILE_POSTS_SCOPES)
+def profile_posts(request, username):
+    return page_response(
+        request, Post.objects.filter(author__username=username),
+        POST_FIELDS,
+        missing=lambda: not User.objects.filter(username=username).exists(),
+    )
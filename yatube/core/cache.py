@@ -0,0 +1,253 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import timing
+
+GENERATION_KEY = 'inval:gen'
+ENTRY_KEY = 'inval:{}'
+# Запись журнала, после которой процессы очищают свой уровень целиком.
+CLEAR_ALL = '*'
+
+_MISSING = object()
+
+
+class TwoTierCache(BaseCache):
+    """Кеш из двух уровней: LRU в памяти процесса и общий бэкенд.
+
+    Локальный уровень небольшой и хранит записи не дольше LOCAL_TIMEOUT
+    секунд. Запись идёт сразу в общий кеш, а изменённые ключи попадают
+    в журнал инвалидации: счётчик поколений 'inval:gen' и записи
+    'inval:<поколение>' с ключом. Не чаще раза в SYNC_INTERVAL секунд
+    процесс дочитывает журнал и выбрасывает у себя изменённые ключи.
+    Если часть журнала уже истекла, локальный уровень очищается целиком.
+
+    Журнал не защищён от гонок при одновременных записях из разных
+    процессов; в худшем случае устаревшее значение живёт до LOCAL_TIMEOUT.
+    """
+
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        self._shared_alias = options.pop('SHARED')
+        self._local_max_entries = int(options.pop('MAX_ENTRIES', 1000))
+        self._local_timeout = float(options.pop('LOCAL_TIMEOUT', 5))
+        self._sync_interval = float(options.pop('SYNC_INTERVAL', 1))
+        self._log_timeout = int(options.pop('LOG_TIMEOUT', 60))
+        super().__init__({**params, 'OPTIONS': options})
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = None
+        self._synced_at = 0
+        self._stats = {
+            'local': {'hits': 0, 'misses': 0},
+            'shared': {'hits': 0, 'misses': 0},
+            'invalidations': {'applied': 0, 'full_clears': 0},
+        }
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def stats(self):
+        """Попадания и промахи по уровням с момента запуска процесса."""
+        with self._lock:
+            return {tier: dict(counts) for tier, counts in self._stats.items()}
+
+    # Локальный уровень.
+
+    def _count(self, tier, name, amount=1):
+        with self._lock:
+            self._stats[tier][name] += amount
+        if tier != 'invalidations':
+            timing.record_cache(tier, name, amount)
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return _MISSING
+            data, expires = entry
+            if expires <= time.monotonic():
+                del self._local[key]
+                return _MISSING
+            self._local.move_to_end(key)
+        # Значения хранятся сериализованными, как в LocMemCache:
+        # кешированный ответ не должен меняться у всех при правке одного.
+        return pickle.loads(data)
+
+    def _local_set(self, key, value, timeout):
+        lifetime = self._local_timeout
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            lifetime = min(lifetime, timeout)
+        if lifetime <= 0:
+            self._local_forget(key)
+            return
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._local[key] = (data, time.monotonic() + lifetime)
+            self._local.move_to_end(key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _local_forget(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+
+    def _local_clear(self):
+        with self._lock:
+            self._local.clear()
+
+    # Журнал инвалидации.
+
+    def _publish(self, *keys):
+        """Записывает изменённые ключи в журнал для других процессов."""
+        shared = self.shared
+        try:
+            generation = shared.incr(GENERATION_KEY, len(keys))
+        except ValueError:
+            shared.add(GENERATION_KEY, 0, None)
+            generation = shared.incr(GENERATION_KEY, len(keys))
+        first = generation - len(keys) + 1
+        shared.set_many({
+            ENTRY_KEY.format(first + offset): key
+            for offset, key in enumerate(keys)
+        }, self._log_timeout)
+        with self._lock:
+            # Свои записи уже учтены локально, журнал до них можно
+            # не перечитывать, если в нём не было чужих записей.
+            if self._generation == first - 1:
+                self._generation = generation
+
+    def _sync(self):
+        now = time.monotonic()
+        if now - self._synced_at < self._sync_interval:
+            return
+        self._synced_at = now
+        generation = self.shared.get(GENERATION_KEY, 0)
+        seen = self._generation
+        self._generation = generation
+        if seen is None or generation == seen:
+            return
+        missed = generation - seen
+        entries = {}
+        # Отставание больше размера LRU проще покрыть полной очисткой.
+        if 0 < missed <= self._local_max_entries:
+            entries = self.shared.get_many([
+                ENTRY_KEY.format(number)
+                for number in range(seen + 1, generation + 1)
+            ])
+        keys = set(entries.values())
+        if len(entries) != missed or CLEAR_ALL in keys:
+            self._local_clear()
+            self._count('invalidations', 'full_clears')
+            return
+        self._local_forget(*keys)
+        self._count('invalidations', 'applied', len(keys))
+
+    # Интерфейс BaseCache.
+
+    def get(self, key, default=None, version=None):
+        local_key = self.make_key(key, version)
+        self._sync()
+        value = self._local_get(local_key)
+        if value is not _MISSING:
+            self._count('local', 'hits')
+            return value
+        self._count('local', 'misses')
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            self._count('shared', 'misses')
+            return default
+        self._count('shared', 'hits')
+        self._local_set(local_key, value, self._local_timeout)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        found, missing = {}, []
+        for key in keys:
+            value = self._local_get(self.make_key(key, version))
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        self._count('local', 'hits', len(found))
+        self._count('local', 'misses', len(missing))
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            self._count('shared', 'hits', len(fetched))
+            self._count('shared', 'misses', len(missing) - len(fetched))
+            for key, value in fetched.items():
+                self._local_set(
+                    self.make_key(key, version), value, self._local_timeout
+                )
+            found.update(fetched)
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        local_key = self.make_key(key, version)
+        self._local_set(local_key, value, timeout)
+        self._publish(local_key)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        local_keys = []
+        for key, value in data.items():
+            local_key = self.make_key(key, version)
+            local_keys.append(local_key)
+            if key in failed:
+                self._local_forget(local_key)
+            else:
+                self._local_set(local_key, value, timeout)
+        if local_keys:
+            self._publish(*local_keys)
+        return failed
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        # Решает общий уровень: локальная копия могла устареть.
+        if not self.shared.add(key, value, timeout, version=version):
+            return False
+        local_key = self.make_key(key, version)
+        self._local_set(local_key, value, timeout)
+        self._publish(local_key)
+        return True
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        local_key = self.make_key(key, version)
+        self._local_forget(local_key)
+        self._publish(local_key)
+        return value
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        local_key = self.make_key(key, version)
+        self._local_forget(local_key)
+        self._publish(local_key)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return
+        self.shared.delete_many(keys, version=version)
+        local_keys = [self.make_key(key, version) for key in keys]
+        self._local_forget(*local_keys)
+        self._publish(*local_keys)
+
+    def clear(self):
+        self.shared.clear()
+        self._local_clear()
+        self._generation = None
+        self._publish(CLEAR_ALL)
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import querylog
+
+
+def apply_pragmas(connection, pragmas):
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """Настраивает каждое новое соединение с SQLite.
+
+    Значения берутся из SQLITE_PRAGMAS в настройках базы или проекта.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = connection.settings_dict.get(
+        'SQLITE_PRAGMAS', settings.SQLITE_PRAGMAS
+    )
+    apply_pragmas(connection, pragmas)
+
+
+@receiver(connection_created)
+def install_query_log(sender, connection, **kwargs):
+    """Подключает журнал медленных запросов к каждому соединению."""
+    querylog.install(connection)
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import profiling
+
+
+class Command(BaseCommand):
+    help = (
+        'Выдаёт подписанный токен для заголовка X-Profile-Token, '
+        'который включает профилирование запроса.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(profiling.make_token())
+        self.stderr.write(
+            f'Токен действует {settings.PROFILE_TOKEN_MAX_AGE} с, '
+            f'профили пишутся в {settings.PROFILE_DIR}'
+        )
@@ -0,0 +1,47 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.routers import PRIMARY
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite в реплики из DATABASE_REPLICAS.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять синхронизацию каждые N секунд.',
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены, задайте YATUBE_REPLICA_DB'
+            )
+        if connections[PRIMARY].vendor != 'sqlite':
+            raise CommandError('Синхронизация рассчитана на SQLite')
+        while True:
+            started = time.monotonic()
+            for alias in settings.DATABASE_REPLICAS:
+                self.sync(alias)
+            self.stdout.write(self.style.SUCCESS(
+                f'Реплики обновлены за {time.monotonic() - started:.2f} с'
+            ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
+
+    def sync(self, alias):
+        source = connections[PRIMARY]
+        source.ensure_connection()
+        # Backup API копирует согласованный снимок базы постранично,
+        # не останавливая запись в основную базу.
+        target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+        try:
+            source.connection.backup(target, pages=1024)
+        finally:
+            target.close()
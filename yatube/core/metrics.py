@@ -0,0 +1,252 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+HISTOGRAM_BUCKETS = {
+    'yatube_request_duration_seconds': REQUEST_BUCKETS,
+    'yatube_db_queries': QUERY_BUCKETS,
+}
+
+# Имя метрики: тип и описание для /metrics.
+METRICS = {
+    'yatube_requests_total': (
+        'counter', 'Запросы по имени URL, методу и статусу.'),
+    'yatube_request_duration_seconds': (
+        'histogram', 'Время обработки запроса по имени URL.'),
+    'yatube_db_queries': (
+        'histogram', 'Число запросов к базе на один запрос по имени URL.'),
+    'yatube_page_cache_total': (
+        'counter', 'Обращения к кешу страниц: попадания и промахи.'),
+    'yatube_thumbnail_kvstore_total': (
+        'counter', 'Чтения KV-хранилища миниатюр: из кеша, из базы, нет.'),
+}
+
+_HEADER = struct.Struct('<Q')
+_LENGTH = struct.Struct('<I')
+_VALUE = struct.Struct('<d')
+_INITIAL_SIZE = 64 * 1024
+
+
+class MmapValues:
+    """Словарь «ключ → число» в файле, отображённом в память.
+
+    У каждого процесса свой файл, а /metrics в любом процессе
+    складывает значения из всех файлов каталога. Запись: длина ключа,
+    ключ с выравниванием до 8 байт и значение double. В заголовке —
+    сколько байт занято; он обновляется после записи, поэтому читатель
+    видит только целые записи.
+    """
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._file = open(path, 'a+b')
+        if os.path.getsize(path) < _INITIAL_SIZE:
+            self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._positions = {}
+        for key, _, position in _records(self._map):
+            self._positions[key] = position
+        if not self._used:
+            self._used = _HEADER.size
+
+    @property
+    def _used(self):
+        return _HEADER.unpack_from(self._map, 0)[0]
+
+    @_used.setter
+    def _used(self, value):
+        _HEADER.pack_into(self._map, 0, value)
+
+    def add(self, key, amount):
+        with self._lock:
+            position = self._positions.get(key)
+            if position is None:
+                position = self._append(key)
+            value = _VALUE.unpack_from(self._map, position)[0]
+            _VALUE.pack_into(self._map, position, value + amount)
+
+    def _append(self, key):
+        encoded = key.encode()
+        padded = _padded(_LENGTH.size + len(encoded))
+        used = self._used
+        if used + padded + _VALUE.size > len(self._map):
+            self._grow(used + padded + _VALUE.size)
+        _LENGTH.pack_into(self._map, used, len(encoded))
+        self._map[used + _LENGTH.size:used + _LENGTH.size + len(encoded)] = (
+            encoded
+        )
+        position = used + padded
+        _VALUE.pack_into(self._map, position, 0.0)
+        self._used = position + _VALUE.size
+        self._positions[key] = position
+        return position
+
+    def _grow(self, needed):
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _padded(length):
+    return (length + 7) // 8 * 8
+
+
+def _records(data):
+    """Записи файла метрик: (ключ, значение, смещение значения)."""
+    used = _HEADER.unpack_from(data, 0)[0] if len(data) >= 8 else 0
+    position = _HEADER.size
+    while position < used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        start = position + _LENGTH.size
+        key = bytes(data[start:start + length]).decode()
+        position += _padded(_LENGTH.size + length)
+        yield key, _VALUE.unpack_from(data, position)[0], position
+        position += _VALUE.size
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def _values():
+    """Файл метрик этого процесса; после fork заводится новый."""
+    global _store, _store_pid
+    pid = os.getpid()
+    if _store_pid != pid:
+        with _store_lock:
+            if _store_pid != pid:
+                os.makedirs(settings.METRICS_DIR, exist_ok=True)
+                _store = MmapValues(os.path.join(
+                    settings.METRICS_DIR, f'metrics_{pid}.db'
+                ))
+                _store_pid = pid
+    return _store
+
+
+def reset():
+    """Закрывает файл процесса; следующий замер откроет его заново."""
+    global _store, _store_pid
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+        _store = _store_pid = None
+
+
+def _key(name, labels):
+    return json.dumps([name, sorted(labels.items())], ensure_ascii=False)
+
+
+def inc(name, labels, amount=1):
+    _values().add(_key(name, labels), amount)
+
+
+def observe(name, labels, value):
+    """Замер гистограммы: корзина, сумма и число наблюдений."""
+    values = _values()
+    for bound in HISTOGRAM_BUCKETS[name]:
+        if value <= bound:
+            values.add(_key(f'{name}_bucket', {**labels, 'le': bound}), 1)
+            break
+    values.add(_key(f'{name}_sum', labels), value)
+    values.add(_key(f'{name}_count', labels), 1)
+
+
+def record_request(view, method, status, duration, db_queries):
+    inc('yatube_requests_total',
+        {'view': view, 'method': method, 'status': str(status)})
+    observe('yatube_request_duration_seconds', {'view': view}, duration)
+    observe('yatube_db_queries', {'view': view}, db_queries)
+
+
+def collect():
+    """Сумма значений по всем файлам каталога METRICS_DIR."""
+    totals = defaultdict(float)
+    pattern = os.path.join(settings.METRICS_DIR, 'metrics_*.db')
+    for path in glob.glob(pattern):
+        with open(path, 'rb') as file:
+            data = file.read()
+        for key, value, _ in _records(data):
+            totals[key] += value
+    return totals
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(
+        f'{name}="{_escape(value)}"' for name, value in labels
+    )
+    return f'{{{pairs}}}'
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('\n', r'\n')
+        .replace('"', r'\"')
+    )
+
+
+def _number(value):
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+def render():
+    """Все метрики в текстовом формате Prometheus."""
+    families = defaultdict(dict)
+    for key, value in collect().items():
+        name, labels = json.loads(key)
+        families[name][tuple(map(tuple, labels))] = value
+    lines = []
+    for name, (kind, description) in METRICS.items():
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'histogram':
+            lines.extend(_histogram_lines(name, families))
+            continue
+        for labels, value in sorted(families[name].items()):
+            lines.append(f'{name}{_format_labels(labels)} {_number(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _histogram_lines(name, families):
+    bounds = HISTOGRAM_BUCKETS[name]
+    observed = defaultdict(dict)
+    for labels, value in families[f'{name}_bucket'].items():
+        rest = tuple(pair for pair in labels if pair[0] != 'le')
+        observed[rest][dict(labels)['le']] = value
+    lines = []
+    for labels, count in sorted(families[f'{name}_count'].items()):
+        cumulative = 0
+        # Корзины хранятся без накопления и только непустые; в выводе
+        # они накопительные и перечислены все.
+        for bound in bounds:
+            cumulative += observed[labels].get(bound, 0)
+            bucket_labels = labels + (('le', _number(bound)),)
+            lines.append(
+                f'{name}_bucket{_format_labels(bucket_labels)} '
+                f'{_number(cumulative)}'
+            )
+        infinity = labels + (('le', '+Inf'),)
+        lines.append(
+            f'{name}_bucket{_format_labels(infinity)} {_number(count)}'
+        )
+        total = families[f'{name}_sum'][labels]
+        lines.append(f'{name}_sum{_format_labels(labels)} {_number(total)}')
+        lines.append(f'{name}_count{_format_labels(labels)} {_number(count)}')
+    return lines
@@ -0,0 +1,144 @@
+import json
+import logging
+import os
+import time
+
+from django.conf import settings
+
+from . import metrics, profiling, timing
+from .routers import pinned_to_primary, replica_reads
+
+logger = logging.getLogger('core.performance')
+
+PIN_COOKIE = 'pin_primary'
+PROFILE_PARAM = '__profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE_TOKEN'
+PROFILE_FILE_HEADER = 'X-Profile-File'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class PrimaryPinMiddleware:
+    """Прикрепляет автора изменений к основной базе на REPLICA_PIN_SECONDS.
+
+    Запрос с записью и следующие за ним запросы того же браузера читают
+    из основной базы, поэтому пользователь сразу видит свои изменения,
+    даже если реплика ещё не догнала основную базу. Остальным
+    безопасным запросам разрешено читать из реплик.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.should_pin(request):
+            with replica_reads():
+                return self.get_response(request)
+        with pinned_to_primary():
+            response = self.get_response(request)
+        if request.method not in SAFE_METHODS and response.status_code < 500:
+            response.set_cookie(
+                PIN_COOKIE,
+                str(time.time() + settings.REPLICA_PIN_SECONDS),
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def should_pin(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        try:
+            return float(request.COOKIES[PIN_COOKIE]) > time.time()
+        except (KeyError, ValueError):
+            return False
+
+
+class PerformanceMiddleware:
+    """Замеряет запрос и отдаёт замеры в Server-Timing и в лог.
+
+    Считаются запросы к базе и их время, рендеринг шаблонов, попадания
+    и промахи кеша по уровням и общее время обработки. Строка лога —
+    JSON в логгере core.performance; счётчики и гистограммы по имени
+    URL уходят в /metrics (core/metrics.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with timing.measure() as timings:
+            response = self.get_response(request)
+        response['Server-Timing'] = self.server_timing(timings)
+        metrics.record_request(
+            timings.view_name or 'unresolved', request.method,
+            response.status_code, timings.total, timings.db_queries,
+        )
+        if logger.isEnabledFor(logging.INFO):
+            self.log(request, response, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Имя view нужно и журналу медленных запросов во время запроса.
+        timings = timing.current()
+        if timings is not None:
+            timings.view_name = request.resolver_match.view_name
+
+    def log(self, request, response, timings):
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': timings.view_name,
+            'status': response.status_code,
+            'total_ms': round(timings.total * 1000, 2),
+            'db_queries': timings.db_queries,
+            'db_ms': round(timings.db_time * 1000, 2),
+            'template_ms': round(timings.template_time * 1000, 2),
+            'cache': timings.cache,
+        }, ensure_ascii=False))
+
+    def server_timing(self, timings):
+        cache = timings.cache
+        return ', '.join((
+            f'db;dur={timings.db_time * 1000:.2f}'
+            f';desc="{timings.db_queries} queries"',
+            f'tpl;dur={timings.template_time * 1000:.2f}',
+            f'cache;desc="local {cache["local"]["hits"]}, '
+            f'shared {cache["shared"]["hits"]}, '
+            f'miss {timings.cache_misses}"',
+            f'total;dur={timings.total * 1000:.2f}',
+        ))
+
+
+class ProfilerMiddleware:
+    """Профилирует отдельный запрос по требованию.
+
+    Включается подписанным заголовком X-Profile-Token (его выдаёт
+    `manage.py profile_token`) или параметром ?__profile для персонала.
+    На время запроса запускается поток, который снимает стек с шагом
+    PROFILE_INTERVAL; результат пишется в PROFILE_DIR в формате
+    collapsed stacks, имя файла приходит в заголовке X-Profile-File.
+    Без этих признаков запрос идёт как обычно.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.requested(request):
+            return self.get_response(request)
+        with profiling.Sampler(settings.PROFILE_INTERVAL) as sampler:
+            response = self.get_response(request)
+        match = request.resolver_match
+        path = profiling.profile_path(
+            match.view_name if match else 'unresolved'
+        )
+        sampler.write(path)
+        response[PROFILE_FILE_HEADER] = os.path.basename(path)
+        return response
+
+    def requested(self, request):
+        token = request.META.get(PROFILE_HEADER)
+        if token is not None:
+            return profiling.valid_token(token)
+        return PROFILE_PARAM in request.GET and request.user.is_staff
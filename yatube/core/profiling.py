@@ -0,0 +1,91 @@
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'core.profiling'
+TOKEN_VALUE = 'profile'
+
+
+def make_token():
+    """Подписанное значение заголовка PROFILE_HEADER."""
+    return signing.TimestampSigner(salt=SALT).sign(TOKEN_VALUE)
+
+
+def valid_token(token):
+    try:
+        value = signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILE_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return value == TOKEN_VALUE
+
+
+def frame_label(code):
+    filename = code.co_filename
+    if filename.startswith(settings.BASE_DIR):
+        filename = os.path.relpath(filename, settings.BASE_DIR)
+    else:
+        filename = os.path.join(*filename.split(os.sep)[-2:])
+    return f'{code.co_name} ({filename}:{code.co_firstlineno})'
+
+
+class Sampler:
+    """Снимает стек одного потока раз в interval секунд.
+
+    Стеки копятся в формате collapsed stacks (кадры через «;» от корня
+    к листу и число попаданий), который понимают flamegraph.pl
+    и speedscope.
+    """
+
+    def __init__(self, interval, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        frame = sys._current_frames().get(self.thread_id)
+        labels = []
+        while frame is not None:
+            labels.append(frame_label(frame.f_code))
+            frame = frame.f_back
+        if labels:
+            self.stacks[';'.join(reversed(labels))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def write(self, path):
+        with open(path, 'w') as file:
+            for stack, count in self.stacks.most_common():
+                file.write(f'{stack} {count}\n')
+
+
+def profile_path(name):
+    """Новый файл профиля в PROFILE_DIR с именем view в названии."""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    safe_name = ''.join(
+        char if char.isalnum() or char in '-_' else '_' for char in name
+    )
+    return os.path.join(
+        settings.PROFILE_DIR,
+        f'{stamp}-{safe_name}-{uuid.uuid4().hex[:8]}.collapsed',
+    )
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import traceback
+
+from django.conf import settings
+
+from . import timing
+
+logger = logging.getLogger('core.slow_queries')
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+_SKIP_ORIGIN = (os.path.dirname(__file__),)
+
+
+def fingerprint(sql):
+    """Запрос без значений: одинаковые по форме запросы совпадают.
+
+    Литералы и параметры заменяются на ?, списки в IN — на (...).
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _LIST_RE.sub('(...)', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+class FingerprintStats:
+    """Суммарное время по отпечаткам запросов в памяти процесса.
+
+    Хранится не больше 2 * limit отпечатков: при переполнении остаются
+    limit самых дорогих по суммарному времени.
+    """
+
+    def __init__(self, limit):
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def add(self, sql, duration):
+        key = fingerprint(sql)
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0
+                }
+                if len(self._stats) > 2 * self.limit:
+                    self._trim()
+            ms = duration * 1000
+            stats['count'] += 1
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+
+    def _trim(self):
+        kept = sorted(
+            self._stats.items(), key=lambda item: item[1]['total_ms'],
+            reverse=True,
+        )[:self.limit]
+        self._stats = dict(kept)
+
+    def top(self, count):
+        """count самых дорогих отпечатков по суммарному времени."""
+        with self._lock:
+            items = sorted(
+                self._stats.items(), key=lambda item: item[1]['total_ms'],
+                reverse=True,
+            )[:count]
+        return [
+            {
+                'sql': sql,
+                'count': stats['count'],
+                'total_ms': round(stats['total_ms'], 2),
+                'max_ms': round(stats['max_ms'], 2),
+            }
+            for sql, stats in items
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._stats = {}
+
+
+stats = FingerprintStats(settings.QUERY_FINGERPRINTS)
+
+
+def origin():
+    """Ближайший к запросу кадр из кода проекта, а не Django и библиотек."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = frame.filename
+        if (filename.startswith(settings.BASE_DIR)
+                and not filename.startswith(_SKIP_ORIGIN)):
+            path = os.path.relpath(filename, settings.BASE_DIR)
+            return f'{path}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def explain(connection, sql, params):
+    """План запроса SELECT; для остальных запросов — None."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    prefix = (
+        'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    )
+    # Курсор бэкенда без execute_wrapper: план не попадает в статистику
+    # и не сбивает результат исходного запроса.
+    cursor = connection.create_cursor()
+    try:
+        cursor.execute(f'{prefix} {sql}', params)
+        return [' '.join(map(str, row)) for row in cursor.fetchall()]
+    except Exception as error:
+        return [f'EXPLAIN не удался: {error}']
+    finally:
+        cursor.close()
+
+
+def record(execute, sql, params, many, context):
+    """execute_wrapper: считает отпечатки и пишет медленные запросы."""
+    started = time.perf_counter()
+    failed = True
+    try:
+        result = execute(sql, params, many, context)
+        failed = False
+        return result
+    finally:
+        duration = time.perf_counter() - started
+        stats.add(sql, duration)
+        if duration * 1000 >= settings.SLOW_QUERY_MS:
+            # План упавшего запроса бесполезен, а в прерванной
+            # транзакции EXPLAIN и сам завершится ошибкой.
+            plan = None if many or failed else explain(
+                context['connection'], sql, params
+            )
+            log_slow(sql, context['connection'], duration, plan)
+
+
+def log_slow(sql, connection, duration, plan):
+    timings = timing.current()
+    logger.warning(json.dumps({
+        'ms': round(duration * 1000, 2),
+        'db': connection.alias,
+        'view': timings.view_name if timings else None,
+        'origin': origin(),
+        'sql': sql,
+        'plan': plan,
+    }, ensure_ascii=False, default=str))
+
+
+def install(connection):
+    if record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record)
@@ -0,0 +1,73 @@
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+
+PRIMARY = 'default'
+# Эти данные должны читаться сразу после записи при любом отставании
+# реплики, иначе пользователя, например, выкинет из сессии.
+PRIMARY_ONLY_APPS = {'sessions'}
+
+_state = threading.local()
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def replica_allowed():
+    return getattr(_state, 'replica', False)
+
+
+@contextmanager
+def replica_reads():
+    """Разрешает текущему потоку читать из реплик.
+
+    Вне блока, например в командах и фоновых задачах, чтения идут
+    в основную базу: там отставание реплики незаметно и опасно.
+    """
+    previous = replica_allowed()
+    _state.replica = True
+    try:
+        yield
+    finally:
+        _state.replica = previous
+
+
+@contextmanager
+def pinned_to_primary():
+    """Внутри блока все чтения текущего потока идут в основную базу."""
+    previous = is_pinned()
+    _state.pinned = True
+    try:
+        yield
+    finally:
+        _state.pinned = previous
+
+
+class PrimaryReplicaRouter:
+    """Запись — в основную базу, чтение — в случайную реплику.
+
+    Реплики перечислены в DATABASE_REPLICAS; без них всё идёт
+    в основную базу. Реплики читаются только внутри replica_reads(),
+    который включает PrimaryPinMiddleware для безопасных запросов.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or is_pinned() or not replica_allowed()
+                or model._meta.app_label in PRIMARY_ONLY_APPS):
+            return PRIMARY
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает в реплики вместе с данными при синхронизации.
+        return db == PRIMARY
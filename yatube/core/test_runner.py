@@ -0,0 +1,30 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+from . import metrics
+
+
+class TestRunner(DiscoverRunner):
+    """Прогон тестов со своим каталогом метрик.
+
+    Middleware пишет метрики на каждый запрос; без отдельного каталога
+    тесты смешивались бы с метриками работающего сервера.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.metrics_dir = tempfile.mkdtemp(prefix='yatube-metrics-')
+        self.metrics_override = override_settings(
+            METRICS_DIR=self.metrics_dir
+        )
+        self.metrics_override.enable()
+        metrics.reset()
+
+    def teardown_test_environment(self, **kwargs):
+        metrics.reset()
+        self.metrics_override.disable()
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,470 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.contrib.sessions.models import Session
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test import override_settings
+from django.urls import reverse
+from sorl.thumbnail import default as thumbnail_default
+
+from posts import caching
+from posts.models import Post, User
+
+from . import metrics, profiling, querylog
+from .cache import ENTRY_KEY, TwoTierCache
+from .middleware import (PIN_COOKIE, PROFILE_FILE_HEADER,
+                         PrimaryPinMiddleware)
+from .routers import (PrimaryReplicaRouter, is_pinned, pinned_to_primary,
+                      replica_allowed, replica_reads)
+
+
+class SqlitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_to_connection(self):
+        """Новое соединение с SQLite получает SQLITE_PRAGMAS"""
+        expected = {
+            "synchronous": 1,
+            "busy_timeout": settings.SQLITE_PRAGMAS["busy_timeout"],
+            "cache_size": settings.SQLITE_PRAGMAS["cache_size"],
+            "temp_store": 2,
+        }
+        for name, value in expected.items():
+            with self.subTest(pragma=name):
+                self.assertEqual(self.pragma(name), value)
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.router = PrimaryReplicaRouter()
+
+    def test_reads_go_to_replica_writes_to_primary(self):
+        """Чтение идёт в реплику, запись — в основную базу"""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), "replica")
+            self.assertEqual(self.router.db_for_write(Post), "default")
+
+    def test_sessions_and_pinned_reads_use_primary(self):
+        """Сессии и чтения после записи идут в основную базу"""
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Session), "default")
+            with pinned_to_primary():
+                self.assertEqual(self.router.db_for_read(Post), "default")
+            self.assertEqual(self.router.db_for_read(Post), "replica")
+
+    def test_reads_outside_requests_use_primary(self):
+        """Вне запросов, например в командах, чтение идёт в основную базу"""
+        self.assertEqual(self.router.db_for_read(Post), "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_everything_is_primary(self):
+        """Без реплик чтение идёт в основную базу"""
+        self.assertEqual(self.router.db_for_read(Post), "default")
+
+
+class PrimaryPinMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.seen = []
+
+        def view(request):
+            self.seen.append(is_pinned())
+            self.replica.append(replica_allowed())
+            return HttpResponse()
+
+        self.replica = []
+        self.middleware = PrimaryPinMiddleware(view)
+
+    def test_write_pins_following_requests(self):
+        """После записи запросы пользователя читают основную базу"""
+        response = self.middleware(self.factory.post("/"))
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], settings.REPLICA_PIN_SECONDS)
+        request = self.factory.get("/")
+        request.COOKIES[PIN_COOKIE] = cookie.value
+        self.middleware(request)
+        self.middleware(self.factory.get("/"))
+        self.assertEqual(self.seen, [True, True, False])
+        self.assertEqual(self.replica, [False, False, True])
+        self.assertFalse(is_pinned())
+        self.assertFalse(replica_allowed())
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    def test_recently_changed_pages_render_from_primary(self):
+        """Страница сессии сразу после изменения читает основную базу"""
+        cache.clear()
+        view = caching.cache_page_versioned(60, "pin_test", ("pin-test",))(
+            self.middleware.get_response
+        )
+        caching.bump("pin-test")
+        with replica_reads():
+            for path in ("/fresh/", "/old/"):
+                request = self.factory.get(path)
+                request.COOKIES[settings.SESSION_COOKIE_NAME] = "session"
+                view(request)
+                cache.set(caching.VERSION_KEY.format("pin-test"), 1, None)
+        self.assertEqual(self.seen, [True, False])
+
+    @override_settings(DATABASE_REPLICAS=["replica"])
+    def test_cache_fills_render_from_primary(self):
+        """Страницу для кеша рендерит основная база, кто бы её ни открыл"""
+        cache.clear()
+        resolved = []
+
+        def scope():
+            resolved.append(is_pinned())
+            return "pin-test"
+
+        view = caching.cache_page_versioned(60, "pin_test", (scope,))(
+            self.middleware.get_response
+        )
+        cache.set(caching.VERSION_KEY.format("pin-test"), 1, None)
+        with replica_reads():
+            # Чужой посетитель без метки автора изменений, до и после
+            # того, как окно REPLICA_PIN_SECONDS закрылось.
+            view(self.factory.get("/"))
+            view(self.factory.get("/"))
+            caching.bump("pin-test")
+            view(self.factory.get("/"))
+        self.assertEqual(self.seen, [True, True])
+        self.assertEqual(resolved, [True, True, True])
+
+    def test_expired_or_broken_cookie_is_ignored(self):
+        """Просроченная или испорченная метка не прикрепляет к основной"""
+        for value in ("0", "abc"):
+            with self.subTest(value=value):
+                request = self.factory.get("/")
+                request.COOKIES[PIN_COOKIE] = value
+                self.middleware(request)
+        self.assertEqual(self.seen, [False, False])
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches["shared"].clear()
+        # Два экземпляра с общим уровнем — как два процесса.
+        self.first = self.process()
+        self.second = self.process()
+
+    def process(self, **options):
+        options = {"SHARED": "shared", "SYNC_INTERVAL": 0, **options}
+        return TwoTierCache("", {"OPTIONS": options})
+
+    def test_repeated_reads_served_by_local_tier(self):
+        """Повторное чтение не доходит до общего кеша"""
+        self.first.set("key", "value")
+        self.assertEqual(self.second.get("key"), "value")
+        self.assertEqual(self.second.get("key"), "value")
+        stats = self.second.stats()
+        self.assertEqual(stats["local"], {"hits": 1, "misses": 1})
+        self.assertEqual(stats["shared"], {"hits": 1, "misses": 0})
+
+    def test_writes_invalidate_other_processes(self):
+        """Запись в одном процессе сбрасывает локальные копии в других"""
+        self.first.set_many({"a": 1, "b": 1})
+        self.assertEqual(self.second.get_many(["a", "b"]), {"a": 1, "b": 1})
+        self.first.set("a", 2)
+        self.first.delete("b")
+        self.assertEqual(self.second.get_many(["a", "b"]), {"a": 2})
+        self.assertEqual(self.second.stats()["invalidations"]["applied"], 2)
+
+    def test_lost_log_entries_clear_local_tier(self):
+        """Пропуск в журнале инвалидации очищает локальный уровень"""
+        self.first.set("key", 1)
+        self.second.get("key")
+        self.first.set("key", 2)
+        caches["shared"].delete(ENTRY_KEY.format(2))
+        self.assertEqual(self.second.get("key"), 2)
+        self.assertEqual(
+            self.second.stats()["invalidations"]["full_clears"], 1
+        )
+
+    def test_local_tier_is_bounded_and_returns_copies(self):
+        """Локальный уровень ограничен по размеру и отдаёт копии"""
+        cache = self.process(MAX_ENTRIES=2)
+        for key in ("a", "b", "c"):
+            cache.set(key, [key])
+        cache.get("a").append("changed")
+        self.assertEqual(cache.get("a"), ["a"])
+        # "a" вытеснен из LRU и при первом чтении пришёл из общего кеша.
+        self.assertEqual(cache.stats()["local"], {"hits": 1, "misses": 1})
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username="egor")
+        Post.objects.create(author=author, text="Тестовый пост")
+
+    def setUp(self):
+        caches["default"].clear()
+
+    def get_logged(self, url):
+        with self.assertLogs("core.performance", "INFO") as logs:
+            response = self.client.get(url)
+        return response, json.loads(logs.records[-1].getMessage())
+
+    def test_server_timing_and_log_line(self):
+        """Замеры запроса уходят в Server-Timing и строку лога"""
+        response, line = self.get_logged(reverse("posts:index"))
+        self.assertEqual(line["view"], "posts:index")
+        self.assertEqual(line["status"], 200)
+        self.assertGreater(line["db_queries"], 0)
+        self.assertGreater(line["template_ms"], 0)
+        header = response["Server-Timing"]
+        for metric in ("db;dur=", f'desc="{line["db_queries"]} queries"',
+                       "tpl;dur=", "cache;desc=", "total;dur="):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, header)
+
+    def test_cached_page_counts_cache_hits(self):
+        """Страница из кеша не рендерит шаблон и считает попадания"""
+        url = reverse("posts:index")
+        self.client.get(url)
+        response, line = self.get_logged(url)
+        self.assertEqual(line["template_ms"], 0)
+        self.assertEqual(line["db_queries"], 0)
+        self.assertGreater(line["cache"]["local"]["hits"], 0)
+        self.assertIn('cache;desc="local', response["Server-Timing"])
+
+
+class SlowQueryLogTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="egor")
+        Post.objects.create(author=cls.author, text="Тестовый пост")
+
+    def setUp(self):
+        caches["default"].clear()
+        querylog.stats.clear()
+
+    def test_fingerprint_hides_values(self):
+        """Отпечаток не зависит от значений и длины списка IN"""
+        self.assertEqual(
+            querylog.fingerprint("SELECT * FROM t WHERE a = 'x' AND b IN "
+                                 "(1, 2,  3) AND c = %s"),
+            querylog.fingerprint("SELECT * FROM t WHERE a = 'y''z' AND b "
+                                 "IN (7) AND c = %s"),
+        )
+
+    @override_settings(SLOW_QUERY_MS=0)
+    def test_slow_query_logged_with_view_origin_and_plan(self):
+        """Медленный запрос пишется с view, местом вызова и планом"""
+        url = reverse("posts:profile", args=[self.author.username])
+        with self.assertLogs("core.slow_queries", "WARNING") as logs:
+            self.client.get(url)
+        lines = [json.loads(record.getMessage()) for record in logs.records]
+        posts = [line for line in lines if "post_author_pub_date_idx" in
+                 " ".join(line["plan"] or [])]
+        self.assertTrue(posts)
+        self.assertEqual(posts[0]["view"], "posts:profile")
+        self.assertTrue(posts[0]["origin"].startswith("posts/"))
+
+    def test_top_fingerprints(self):
+        """Топ отпечатков упорядочен по суммарному времени и ограничен"""
+        stats = querylog.FingerprintStats(limit=2)
+        for table, duration in (("a", 0.1), ("b", 0.3), ("c", 0.2),
+                                ("d", 0.01), ("e", 0.02)):
+            stats.add(f"SELECT * FROM {table} WHERE id = 1", duration)
+        stats.add("SELECT * FROM a WHERE id = 2", 0.1)
+        # Пятый отпечаток переполнил топ: остались два самых дорогих.
+        self.assertEqual(
+            [(row["sql"][14], row["count"]) for row in stats.top(10)],
+            [("b", 1), ("c", 1), ("a", 1)],
+        )
+
+    def test_query_stats_only_for_staff(self):
+        """Топ запросов доступен только персоналу"""
+        url = reverse("query_stats")
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(
+            User.objects.create_user(username="admin", is_staff=True)
+        )
+        response = self.client.get(url, {"limit": 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(response.json()["queries"]), 3)
+
+
+class ProfilerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(username="admin", is_staff=True)
+        cls.user = User.objects.create_user(username="egor")
+
+    def setUp(self):
+        caches["default"].clear()
+        self.profile_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.profile_dir)
+        settings_override = override_settings(PROFILE_DIR=self.profile_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def profiles(self):
+        return os.listdir(self.profile_dir)
+
+    def test_sampler_collects_collapsed_stacks(self):
+        """Сэмплер пишет стеки потока в формате collapsed stacks"""
+        def busy_view():
+            deadline = time.monotonic() + 0.05
+            while time.monotonic() < deadline:
+                pass
+
+        with profiling.Sampler(0.001) as sampler:
+            busy_view()
+        path = os.path.join(self.profile_dir, "test.collapsed")
+        sampler.write(path)
+        with open(path) as file:
+            lines = file.read().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(any("busy_view (core/tests.py" in line
+                            for line in lines))
+        for line in lines:
+            stack, count = line.rsplit(" ", 1)
+            self.assertGreater(int(count), 0)
+
+    def test_staff_parameter_writes_profile(self):
+        """?__profile персонала пишет профиль, у остальных — нет"""
+        url = reverse("posts:index")
+        self.client.force_login(self.user)
+        response = self.client.get(url, {"__profile": ""})
+        self.assertNotIn(PROFILE_FILE_HEADER, response)
+        self.assertEqual(self.profiles(), [])
+        self.client.force_login(self.staff)
+        response = self.client.get(url, {"__profile": ""})
+        self.assertEqual(self.profiles(), [response[PROFILE_FILE_HEADER]])
+        self.assertIn("posts_index", response[PROFILE_FILE_HEADER])
+
+    def test_signed_header_writes_profile(self):
+        """Подписанный заголовок включает профилирование, поддельный — нет"""
+        url = reverse("posts:index")
+        self.client.get(url, HTTP_X_PROFILE_TOKEN="profile:forged")
+        self.assertEqual(self.profiles(), [])
+        response = self.client.get(
+            url, HTTP_X_PROFILE_TOKEN=profiling.make_token()
+        )
+        self.assertEqual(self.profiles(), [response[PROFILE_FILE_HEADER]])
+
+
+def increment_in_child(count):
+    for _ in range(count):
+        metrics.inc("yatube_page_cache_total", {"page": "p", "result": "hit"})
+
+
+class MetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username="egor")
+        Post.objects.create(author=author, text="Тестовый пост")
+
+    def setUp(self):
+        caches["default"].clear()
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir)
+        settings_override = override_settings(METRICS_DIR=metrics_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def scrape(self):
+        response = self.client.get(
+            reverse("metrics"), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("text/plain", response["Content-Type"])
+        return response.content.decode().splitlines()
+
+    def test_requests_histograms_and_page_cache(self):
+        """Запросы, гистограммы и кеш страниц попадают в /metrics"""
+        for _ in range(2):
+            self.client.get(reverse("posts:index"))
+        lines = self.scrape()
+        expected = (
+            'yatube_requests_total{method="GET",status="200",'
+            'view="posts:index"} 2',
+            'yatube_request_duration_seconds_bucket{view="posts:index",'
+            'le="+Inf"} 2',
+            'yatube_request_duration_seconds_count{view="posts:index"} 2',
+            'yatube_db_queries_bucket{view="posts:index",le="0"} 1',
+            'yatube_page_cache_total{page="index_page",result="hit"} 1',
+            'yatube_page_cache_total{page="index_page",result="miss"} 1',
+        )
+        for line in expected:
+            with self.subTest(line=line):
+                self.assertIn(line, lines)
+
+    @override_settings(METRICS_TOKEN="secret")
+    def test_metrics_require_token(self):
+        """С токеном /metrics отвечает только по нему, даже INTERNAL_IPS"""
+        url = reverse("metrics")
+        outside = {"REMOTE_ADDR": "203.0.113.5"}
+        cases = (
+            ({}, 404),
+            (outside, 404),
+            ({**outside, "HTTP_AUTHORIZATION": "Bearer wrong"}, 404),
+            ({**outside, "HTTP_AUTHORIZATION": "Bearer secret"}, 200),
+        )
+        for extra, status in cases:
+            with self.subTest(extra=extra):
+                self.assertEqual(
+                    self.client.get(url, **extra).status_code, status
+                )
+
+    def test_metrics_without_token_only_in_debug(self):
+        """Без токена /metrics открыт только при DEBUG и с INTERNAL_IPS"""
+        url = reverse("metrics")
+        outside = {"REMOTE_ADDR": "203.0.113.5"}
+        self.assertEqual(
+            self.client.get(url, HTTP_AUTHORIZATION="Bearer ").status_code,
+            404,
+        )
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get(url).status_code, 200)
+            self.assertEqual(self.client.get(url, **outside).status_code, 404)
+
+    def test_counters_add_up_across_threads_and_processes(self):
+        """Счётчики суммируются по потокам и процессам"""
+        threads = [
+            threading.Thread(target=increment_in_child, args=(500,))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        child = get_context("fork").Process(
+            target=increment_in_child, args=(300,)
+        )
+        child.start()
+        child.join()
+        self.assertEqual(child.exitcode, 0)
+        self.assertIn(
+            'yatube_page_cache_total{page="p",result="hit"} 2300',
+            self.scrape(),
+        )
+
+    def test_thumbnail_kvstore_reads_counted(self):
+        """Чтения KV-хранилища миниатюр считаются по источнику"""
+        for _ in range(2):
+            self.assertIsNone(
+                thumbnail_default.kvstore._get_raw("missing-key")
+            )
+        lines = self.scrape()
+        self.assertIn('yatube_thumbnail_kvstore_total{result="missing"} 1',
+                      lines)
+        self.assertIn('yatube_thumbnail_kvstore_total{result="cache"} 1',
+                      lines)
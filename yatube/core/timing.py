@@ -0,0 +1,94 @@
+import contextvars
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template import base
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Замеры одного запроса: база, шаблоны, кеш и общее время."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_name = None
+        self.total = 0.0
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self._template_depth = 0
+        self.cache = {
+            'local': {'hits': 0, 'misses': 0},
+            'shared': {'hits': 0, 'misses': 0},
+        }
+
+    def __call__(self, execute, sql, params, many, context):
+        # execute_wrapper: время каждого запроса ко всем базам.
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.db_queries += 1
+
+    @property
+    def cache_hits(self):
+        return self.cache['local']['hits'] + self.cache['shared']['hits']
+
+    @property
+    def cache_misses(self):
+        return self.cache['shared']['misses']
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+
+def current():
+    """Замеры текущего запроса или None вне запроса."""
+    return _current.get()
+
+
+@contextmanager
+def measure():
+    """Собирает замеры для кода внутри блока."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            yield timings
+    finally:
+        timings.finish()
+        _current.reset(token)
+
+
+def record_cache(tier, name, amount=1):
+    timings = _current.get()
+    if timings is not None:
+        timings.cache[tier][name] += amount
+
+
+_original_render = base.Template.render
+
+
+def _timed_render(self, context):
+    timings = _current.get()
+    # Вложенные шаблоны (include, inclusion_tag) уже входят во время
+    # внешнего, поэтому замеряется только верхний уровень.
+    if timings is None or timings._template_depth:
+        return _original_render(self, context)
+    timings._template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        timings.template_time += time.perf_counter() - started
+        timings._template_depth -= 1
+
+
+def install():
+    """Подключает замер рендеринга шаблонов; вызывается один раз."""
+    base.Template.render = _timed_render
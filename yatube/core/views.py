@@ -1,5 +1,15 @@
+import hmac
+import os
+
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render
 
+from . import metrics, querylog
+
+TOP_QUERIES = 20
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -11,3 +21,41 @@ def csrf_failure(request, reason=''):
 
 def server_error(request):
     return render(request, 'core/500.html')
+
+
+@staff_member_required
+def query_stats(request):
+    """Самые дорогие по суммарному времени запросы этого процесса."""
+    try:
+        count = int(request.GET.get('limit', TOP_QUERIES))
+    except ValueError:
+        count = TOP_QUERIES
+    return JsonResponse(
+        {'pid': os.getpid(), 'queries': querylog.stats.top(count)},
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+def metrics_allowed(request):
+    token = settings.METRICS_TOKEN
+    if not token:
+        return settings.DEBUG and (
+            request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+        )
+    return hmac.compare_digest(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    )
+
+
+def metrics_view(request):
+    """Метрики всех процессов в текстовом формате Prometheus.
+
+    Доступ — по METRICS_TOKEN, а без него только при DEBUG с INTERNAL_IPS;
+    остальные получают 404, чтобы не раскрывать, что адрес существует.
+    """
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
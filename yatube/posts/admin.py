@@ -1,16 +1,92 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.core.exceptions import ValidationError
+from django.utils import timezone
+
 from .models import Post, Group, Comment, Follow
+from .paginators import EstimatedCountPaginator
+from . import caching, search
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Общие настройки для таблиц с миллионами строк."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
 
+class GroupActionForm(ActionForm):
+    group = forms.ModelChoiceField(
+        Group.objects.all(), required=False, label='Группа',
+        empty_label='без группы',
+    )
 
-class PostAdmin(admin.ModelAdmin):
+
+class PostAdmin(LargeTableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
-    list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    raw_id_fields = ('author',)
+    autocomplete_fields = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
+    date_hierarchy = 'pub_date'
     empty_value_display = '-пусто-'
+    # Вместо list_editable: виджет группы в каждой строке делал запрос
+    # на строку, а перенос выбранных постов — это один UPDATE.
+    action_form = GroupActionForm
+    actions = ('move_to_group',)
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по тексту идёт через полнотекстовый индекс, а не LIKE.
+        if not search.fts_query(search_term):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return queryset.filter(pk__in=search.post_ids(search_term)), False
+
+    def move_to_group(self, request, queryset):
+        try:
+            group = self.action_form.base_fields['group'].clean(
+                request.POST.get('group')
+            )
+        except ValidationError:
+            self.message_user(request, 'Группа не найдена', messages.ERROR)
+            return
+        updated = queryset.update(group=group, updated=timezone.now())
+        # UPDATE не вызывает сигналы, поэтому кеш страниц сбрасываем сами.
+        caching.bump('index', 'groups')
+        self.message_user(request, f'Перенесено постов: {updated}')
+    move_to_group.short_description = 'Перенести в группу'
+
+
+class GroupAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'title', 'slug')
+    search_fields = ('title', 'slug')
+    prepopulated_fields = {'slug': ('title',)}
+
+
+class CommentAdmin(LargeTableAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author', 'post')
+    raw_id_fields = ('author', 'post')
+    empty_value_display = '-пусто-'
+    actions = ('delete_comments',)
+
+    def delete_comments(self, request, queryset):
+        # delete() отправляет post_delete по каждому комментарию:
+        # сигнал сдвигает счётчик поста и сбрасывает его кеш.
+        deleted, _ = queryset.delete()
+        self.message_user(request, f'Удалено комментариев: {deleted}')
+    delete_comments.short_description = 'Удалить без подтверждения'
+
+
+class FollowAdmin(LargeTableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
 
 
 admin.site.register(Post, PostAdmin)
-admin.site.register(Group)
-admin.site.register(Comment)
-admin.site.register(Follow)
+admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,176 @@
+import hashlib
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from core import metrics
+from core.routers import pinned_to_primary
+
+VERSION_KEY = 'posts:version:{}'
+
+
+def _now():
+    return int(time.time() * 1000)
+
+
+def get_versions(*scopes):
+    """Возвращает версии областей кеша в порядке scopes.
+
+    Версия — метка времени последнего изменения в миллисекундах.
+    Для области, которой ещё нет в кеше, заводится текущая метка.
+    """
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _now(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Сдвигает версии областей: их старые страницы больше не читаются."""
+    keys = [VERSION_KEY.format(scope) for scope in scopes if scope]
+    current = cache.get_many(keys)
+    now = _now()
+    cache.set_many(
+        {key: max(now, current.get(key, 0) + 1) for key in keys}, None
+    )
+
+
+def _scope_names(scopes, kwargs):
+    return [
+        scope(**kwargs) if callable(scope) else scope.format(**kwargs)
+        for scope in scopes
+    ]
+
+
+def _request_versions(request, scopes, kwargs):
+    """Версии областей для запроса; считаются один раз на запрос.
+
+    Функции в scopes могут ходить в базу, поэтому запоминаются версии
+    по самим scopes и аргументам view, а не по именам областей.
+    """
+    key = (tuple(scopes), tuple(sorted(kwargs.items())))
+    known = request.__dict__.setdefault('_scope_versions', {})
+    if key not in known:
+        # Имя области по отстающей реплике могло бы указать на старую
+        # область, например на прежнего автора только что созданного поста.
+        with pinned_to_primary():
+            names = _scope_names(scopes, kwargs)
+        known[key] = get_versions(*names)
+    return known[key]
+
+
+def _filled_from_primary(view):
+    """Страница для кеша рендерится из основной базы.
+
+    cache_page вызывает view только при промахе, и ответ сохраняется
+    под текущими версиями областей. Отставшая реплика положила бы туда
+    данные до изменения, и они жили бы в кеше весь срок страницы.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with pinned_to_primary():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _private_if_csrf(view):
+    """Помечает private ответы с csrf-токеном: кеш страниц их не хранит.
+
+    Токен в форме связан с cookie браузера, чужому браузеру он не
+    подойдёт, а CsrfViewMiddleware ставит Vary: Cookie уже после
+    того, как cache_page сохранил ответ.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        if request.META.get('CSRF_COOKIE_USED'):
+            patch_cache_control(response, private=True)
+        return response
+    return wrapper
+
+
+def cache_page_versioned(timeout, key_prefix, scopes):
+    """Кеширует страницу как cache_page, добавляя к ключу версии областей.
+
+    scopes — строки-шаблоны вида 'group:{slug}', которые заполняются
+    аргументами view, или функции, принимающие эти аргументы.
+
+    В кеш попадают только страницы посетителей без сессии: у вошедшего
+    пользователя в странице его имя, кнопки и csrf-токен. Проверяется
+    cookie сессии, а не request.user, чтобы не читать сессию из базы.
+
+    Страница, которая попадёт в кеш, всегда рендерится из основной
+    базы. Страницы вошедших пользователей читают основную базу, если
+    область менялась последние REPLICA_PIN_SECONDS: реплика может ещё
+    не знать об изменении.
+    """
+    def decorator(view):
+        private_view = _filled_from_primary(_private_if_csrf(view))
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            scope_versions = _request_versions(request, scopes, kwargs)
+            if settings.SESSION_COOKIE_NAME in request.COOKIES:
+                changed_ms = _now() - max(scope_versions)
+                fresh = changed_ms < settings.REPLICA_PIN_SECONDS * 1000
+                with pinned_to_primary() if fresh else nullcontext():
+                    return view(request, *args, **kwargs)
+            versions = '.'.join(map(str, scope_versions))
+            cached_view = cache_page(
+                timeout, key_prefix=f'{key_prefix}:{versions}'
+            )(private_view)
+            response = cached_view(request, *args, **kwargs)
+            # CacheMiddleware ставит этот флаг, когда страницы не было
+            # в кеше и её нужно сохранить.
+            if request.method in ('GET', 'HEAD'):
+                missed = getattr(request, '_cache_update_cache', False)
+                metrics.inc('yatube_page_cache_total', {
+                    'page': key_prefix, 'result': 'miss' if missed else 'hit',
+                })
+            return response
+        return wrapper
+    return decorator
+
+
+def condition_versioned(key_prefix, scopes):
+    """Отвечает 304 Not Modified, если версии областей не менялись.
+
+    ETag и Last-Modified считаются по версиям тех же областей, что
+    и у cache_page_versioned, без запросов к страницам и шаблонам.
+    Страница зависит от пользователя и csrf-токена в формах, поэтому
+    их cookie тоже входят в ETag. Дата о смене пользователя не знает:
+    при этих cookie Last-Modified не отдаётся и If-Modified-Since
+    не проверяется, иначе после входа браузер получил бы 304 на
+    сохранённую анонимную страницу.
+    """
+    def user_cookies(request):
+        return [
+            request.COOKIES.get(name, '')
+            for name in (settings.SESSION_COOKIE_NAME,
+                         settings.CSRF_COOKIE_NAME)
+        ]
+
+    def etag(request, *args, **kwargs):
+        parts = [key_prefix, *map(str, _request_versions(
+            request, scopes, kwargs
+        ))]
+        parts += user_cookies(request)
+        return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        if any(user_cookies(request)):
+            return None
+        version = max(_request_versions(request, scopes, kwargs))
+        return datetime.fromtimestamp(version / 1000, tz=timezone.utc)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
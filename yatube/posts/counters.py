@@ -0,0 +1,74 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, UserStats
+
+USER_COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+}
+
+
+def bump_user(user_id, field, delta):
+    """Атомарно сдвигает счётчик пользователя на delta."""
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta}
+    )
+
+
+def bump_comments(post_id, delta):
+    """Атомарно сдвигает счётчик комментариев поста на delta."""
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def _count(model, field):
+    """Подзапрос с числом строк model, ссылающихся на внешнюю запись."""
+    rows = (
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by().values(field)
+        .annotate(total=Count('pk')).values('total')
+    )
+    return Coalesce(Subquery(rows), 0)
+
+
+def recount_users(users):
+    """Пересчитывает счётчики пользователей, возвращает число исправлений.
+
+    users — queryset пользователей, обычно одна пачка по первичному ключу.
+    """
+    actual = users.annotate(**{
+        field: _count(model, lookup)
+        for field, (model, lookup) in USER_COUNTERS.items()
+    }).values('pk', *USER_COUNTERS)
+    actual = {row.pop('pk'): row for row in actual}
+    stored = UserStats.objects.in_bulk(list(actual))
+    changed, created = [], []
+    for user_id, counts in actual.items():
+        stats = stored.get(user_id)
+        if stats is None:
+            created.append(UserStats(user_id=user_id, **counts))
+            continue
+        if any(getattr(stats, field) != value
+               for field, value in counts.items()):
+            for field, value in counts.items():
+                setattr(stats, field, value)
+            changed.append(stats)
+    UserStats.objects.bulk_create(created)
+    UserStats.objects.bulk_update(changed, list(USER_COUNTERS))
+    return len(created) + len(changed)
+
+
+def recount_posts(posts):
+    """Пересчитывает счётчики комментариев, возвращает число исправлений."""
+    changed = []
+    rows = posts.annotate(actual=_count(Comment, 'post')).values_list(
+        'pk', 'comments_count', 'actual'
+    )
+    for pk, stored, actual in rows:
+        if stored != actual:
+            changed.append(Post(pk=pk, comments_count=actual))
+    Post.objects.bulk_update(changed, ['comments_count'])
+    return len(changed)
@@ -0,0 +1,108 @@
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .models import Group, Post, User
+
+FEED_COUNT = 20
+TITLE_WORDS = 8
+
+
+class PostsFeed(Feed):
+    """Последние посты ленты в RSS.
+
+    Выборки идут по индексам (…, -pub_date, -id) и ограничены
+    FEED_COUNT записями; автор и группа подтягиваются одним запросом.
+    """
+    title = 'Yatube: последние записи'
+    description = 'Новые записи всех авторов'
+
+    def link(self, obj=None):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj=None):
+        return self.posts(obj).select_related(
+            'author', 'group'
+        ).order_by('-pub_date', '-id')[:FEED_COUNT]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(TITLE_WORDS)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_author_link(self, item):
+        return reverse('posts:profile', args=[item.author.username])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.updated
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group_id else []
+
+
+class GroupPostsFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Yatube: группа «{obj.title}»'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_posts', args=[obj.slug])
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class AuthorPostsFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Yatube: записи {obj.username}'
+
+    def description(self, obj):
+        return f'Новые записи пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class AtomFeedMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj=None):
+        return self._get_dynamic_attr('description', obj)
+
+
+class PostsAtomFeed(AtomFeedMixin, PostsFeed):
+    pass
+
+
+class GroupPostsAtomFeed(AtomFeedMixin, GroupPostsFeed):
+    pass
+
+
+class AuthorPostsAtomFeed(AtomFeedMixin, AuthorPostsFeed):
+    pass
@@ -0,0 +1,30 @@
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import metrics
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """KV-хранилище sorl-thumbnail, которое считает чтения для /metrics.
+
+    Повторяет _get_raw из cached_db_kvstore, отмечая, откуда пришло
+    значение: из кеша, из базы или его нет нигде.
+    """
+
+    def _get_raw(self, key):
+        value = self.cache.get(key)
+        result = 'cache'
+        if value is None:
+            try:
+                value = KVStoreModel.objects.get(key=key).value
+                result = 'db'
+            except KVStoreModel.DoesNotExist:
+                # Отсутствие тоже кешируется, чтобы не ходить в базу снова.
+                value = cached_db_kvstore.EMPTY_VALUE
+                result = 'missing'
+            self.cache.set(key, value, settings.THUMBNAIL_CACHE_TIMEOUT)
+        metrics.inc('yatube_thumbnail_kvstore_total', {'result': result})
+        if value == cached_db_kvstore.EMPTY_VALUE:
+            return None
+        return value
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from posts import timelines
+from posts.models import Follow, User
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', dest='username',
+            help='Пересобрать ленту только этого пользователя.',
+        )
+
+    def handle(self, *args, **options):
+        if options['username']:
+            users = User.objects.filter(
+                username=options['username']
+            ).values_list('pk', flat=True)
+        else:
+            users = (
+                Follow.objects.order_by('user_id')
+                .values_list('user_id', flat=True).distinct()
+            )
+        rebuilt = 0
+        for user_id in users.iterator():
+            timelines.rebuild(user_id)
+            rebuilt += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Пересобрано лент: {rebuilt}'
+        ))
@@ -0,0 +1,135 @@
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections, transaction
+from django.db.models import F
+
+from posts.models import Comment, Post, User
+
+# Настройки SQLite по умолчанию; journal_mode задаётся явно, потому что
+# режим WAL сохраняется в самом файле базы.
+BASELINE_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'busy_timeout': 0,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite под параллельной '
+        'нагрузкой без настроек и с SQLITE_PRAGMAS. Работает на копии базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help='Доля операций записи.',
+        )
+        parser.add_argument(
+            '--no-pragmas', action='store_true',
+            help='Замерить только базу без настроек.',
+        )
+
+    def handle(self, *args, **options):
+        if connections['default'].vendor != 'sqlite':
+            raise CommandError('Бенчмарк рассчитан на SQLite')
+        modes = [('без настроек', BASELINE_PRAGMAS)]
+        if not options['no_pragmas']:
+            modes.append(('SQLITE_PRAGMAS', None))
+        for number, (title, pragmas) in enumerate(modes):
+            reads, writes, errors, elapsed = self.run(
+                f'benchmark_{number}', pragmas, options
+            )
+            self.stdout.write(
+                f'{title}: чтений {reads / elapsed:.0f}/с, '
+                f'записей {writes / elapsed:.0f}/с, ошибок {errors}'
+            )
+
+    def run(self, alias, pragmas, options):
+        handle, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        try:
+            self.copy_database(path)
+            settings_dict = dict(connections['default'].settings_dict)
+            settings_dict['NAME'] = path
+            if pragmas is not None:
+                settings_dict['SQLITE_PRAGMAS'] = pragmas
+            connections.databases[alias] = settings_dict
+            post = self.prepare(alias)
+            deadline = time.monotonic() + options['seconds']
+            started = time.monotonic()
+            with ThreadPoolExecutor(options['threads']) as pool:
+                results = list(pool.map(
+                    lambda _: self.worker(
+                        alias, post, deadline, options['write_ratio']
+                    ),
+                    range(options['threads']),
+                ))
+            elapsed = time.monotonic() - started
+        finally:
+            connections[alias].close()
+            del connections.databases[alias]
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+        reads, writes, errors = map(sum, zip(*results))
+        return reads, writes, errors, elapsed
+
+    def copy_database(self, path):
+        source = connections['default']
+        source.ensure_connection()
+        target = sqlite3.connect(path)
+        try:
+            source.connection.backup(target)
+        finally:
+            target.close()
+
+    def prepare(self, alias):
+        # bulk_create не вызывает сигналы, которые писали бы в default.
+        username = f'benchmark-{time.time_ns()}'
+        User.objects.using(alias).bulk_create([User(username=username)])
+        user = User.objects.using(alias).get(username=username)
+        Post.objects.using(alias).bulk_create(
+            [Post(author=user, text='бенчмарк')]
+        )
+        return Post.objects.using(alias).get(author=user)
+
+    def worker(self, alias, post, deadline, write_ratio):
+        reads = writes = errors = 0
+        try:
+            while time.monotonic() < deadline:
+                try:
+                    if random.random() < write_ratio:
+                        self.write(alias, post)
+                        writes += 1
+                    else:
+                        self.read(alias)
+                        reads += 1
+                except OperationalError:
+                    errors += 1
+        finally:
+            connections[alias].close()
+        return reads, writes, errors
+
+    def read(self, alias):
+        list(
+            Post.objects.using(alias)
+            .select_related('author', 'group')[:10]
+        )
+
+    def write(self, alias, post):
+        with transaction.atomic(using=alias):
+            Comment.objects.using(alias).bulk_create([Comment(
+                post_id=post.pk, author_id=post.author_id, text='бенчмарк',
+            )])
+            Post.objects.using(alias).filter(pk=post.pk).update(
+                comments_count=F('comments_count') + 1
+            )
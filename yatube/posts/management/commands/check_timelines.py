@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from posts import timelines
+from posts.models import Follow, TimelineEntry, User
+
+
+class Command(BaseCommand):
+    help = 'Сверяет материализованные ленты с подписками и постами.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix', action='store_true',
+            help='Исправить найденные расхождения.',
+        )
+
+    def handle(self, *args, **options):
+        users = (
+            User.objects.filter(
+                Q(pk__in=Follow.objects.values('user_id'))
+                | Q(pk__in=TimelineEntry.objects.values('user_id'))
+            )
+            .order_by('pk').values_list('pk', 'username')
+        )
+        broken = 0
+        for user_id, username in users.iterator():
+            missing = timelines.missing_posts(user_id).count()
+            extra = timelines.extra_entries(user_id).count()
+            if not missing and not extra:
+                continue
+            broken += 1
+            self.stdout.write(
+                f'{username}: не хватает {missing}, лишних {extra}'
+            )
+            if options['fix']:
+                timelines.repair(user_id)
+        if broken and not options['fix']:
+            raise CommandError(f'Расхождения в лентах: {broken}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверка завершена, исправлено лент: {broken}'
+            if broken else 'Ленты согласованы с подписками'
+        ))
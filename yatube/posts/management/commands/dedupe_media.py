@@ -0,0 +1,65 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from posts import caching
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переименовывает картинки постов по хешу содержимого, '
+        'склеивая одинаковые файлы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет сделано.',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = Post._meta.get_field('image').storage
+        names = (
+            Post.objects.exclude(image='').order_by()
+            .values_list('image', flat=True).distinct()
+        )
+        renamed = {}
+        kept = set()
+        missing = reclaimed = 0
+        for name in names.iterator():
+            if not storage.exists(name):
+                missing += 1
+                self.stderr.write(f'Файл не найден: {name}')
+                continue
+            with storage.open(name) as content:
+                content = File(content, name)
+                new_name = storage.hashed_name(name, content)
+                if new_name == name:
+                    continue
+                if new_name in kept or storage.exists(new_name):
+                    reclaimed += content.size
+                elif not dry_run:
+                    # Первая копия содержимого остаётся на диске.
+                    storage.save(name, content)
+            kept.add(new_name)
+            renamed[name] = new_name
+        if not dry_run and renamed:
+            now = timezone.now()
+            with transaction.atomic():
+                for name, new_name in renamed.items():
+                    Post.objects.filter(image=name).update(
+                        image=new_name, updated=now
+                    )
+            # Область 'groups' входит в ключ каждой страницы с постами,
+            # так что закешированные ссылки на старые файлы сбрасываются.
+            caching.bump('groups')
+            for name in renamed:
+                storage.delete(name)
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Будет переименовано" if dry_run else "Переименовано"} '
+            f'файлов: {len(renamed)} → {len(kept)}, '
+            f'освобождено байт: {reclaimed}, не найдено: {missing}'
+        ))
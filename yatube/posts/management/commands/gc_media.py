@@ -0,0 +1,78 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from sorl.thumbnail import default
+
+from posts import media_gc
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет картинки и миниатюры, на которые больше не ссылается '
+        'ни один пост.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать, что будет удалено.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько файлов удалять за один проход.',
+        )
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Не трогать файлы моложе стольких секунд.',
+        )
+
+    def delete_files(self, names):
+        for name in names:
+            try:
+                os.remove(os.path.join(settings.MEDIA_ROOT, name))
+            except FileNotFoundError:
+                pass
+
+    def delete_batch(self, batch, options):
+        """Удаляет пачку {имя: размер}, возвращает число файлов и байт."""
+        names = list(batch)
+        if not options['dry_run']:
+            # Ссылки проверяются заново: файл могли загрузить снова.
+            names = media_gc.still_unused(names, options['min_age'])
+            self.delete_files(names)
+        if options['verbosity'] > 1:
+            for name in names:
+                self.stdout.write(name)
+        return len(names), sum(batch[name] for name in names)
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        batch_size = options['batch_size']
+        images = media_gc.referenced_images()
+        thumbnails, stale_keys = media_gc.scan_kvstore(images)
+        keep = images | thumbnails
+        deleted = reclaimed = 0
+        batch = {}
+        for name, size in media_gc.media_files(options['min_age']):
+            if name in keep:
+                continue
+            batch[name] = size
+            if len(batch) == batch_size:
+                count, freed = self.delete_batch(batch, options)
+                deleted += count
+                reclaimed += freed
+                batch = {}
+        count, freed = self.delete_batch(batch, options)
+        deleted += count
+        reclaimed += freed
+        if not dry_run:
+            for start in range(0, len(stale_keys), batch_size):
+                default.kvstore._delete_raw(
+                    *stale_keys[start:start + batch_size]
+                )
+        self.stdout.write(self.style.SUCCESS(
+            f'{"Будет удалено" if dry_run else "Удалено"} файлов: {deleted}, '
+            f'освобождено байт: {reclaimed}, '
+            f'записей KV-хранилища: {len(stale_keys)}'
+        ))
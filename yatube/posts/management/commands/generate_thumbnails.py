@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+CHUNK_PER_WORKER = 10
+
+
+class Command(BaseCommand):
+    help = 'Создаёт недостающие миниатюры для картинок всех постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько картинок обрабатывать параллельно; '
+                 '1 — без пула потоков.',
+        )
+
+    def results(self, images, workers):
+        """Результаты generate_safely по картинкам, не храня их списком.
+
+        pool.map сразу ставит в очередь все задачи, поэтому картинки
+        подаются ему пачками по CHUNK_PER_WORKER на поток.
+        """
+        if workers <= 1:
+            yield from map(thumbnails.generate_safely, images)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                chunk = list(islice(images, workers * CHUNK_PER_WORKER))
+                if not chunk:
+                    return
+                yield from pool.map(thumbnails.generate_in_thread, chunk)
+
+    def handle(self, *args, **options):
+        images = (
+            post.image for post in
+            Post.objects.exclude(image='').only('pk', 'image')
+            .iterator(chunk_size=500)
+        )
+        done = failed = 0
+        for result in self.results(images, options['workers']):
+            if result:
+                done += 1
+            else:
+                failed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done}, с ошибками: {failed}'
+        ))
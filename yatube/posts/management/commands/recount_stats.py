@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Сколько строк пересчитывать за один проход.',
+        )
+
+    def recount(self, queryset, recount, chunk_size):
+        fixed = last_pk = 0
+        while True:
+            ids = list(
+                queryset.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return fixed
+            fixed += recount(queryset.filter(pk__in=ids))
+            last_pk = ids[-1]
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        users = self.recount(
+            User.objects.all(), counters.recount_users, chunk_size
+        )
+        posts = self.recount(
+            Post.objects.all(), counters.recount_posts, chunk_size
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено счётчиков: пользователей {users}, постов {posts}'
+        ))
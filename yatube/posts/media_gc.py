@@ -0,0 +1,108 @@
+import os
+import time
+
+from django.conf import settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import deserialize
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix, del_prefix
+from sorl.thumbnail.models import KVStore
+
+from .models import Post
+
+CHUNK_SIZE = 1000
+
+
+def referenced_images():
+    """Имена файлов, на которые ссылаются посты."""
+    names = (
+        Post.objects.exclude(image='').order_by()
+        .values_list('image', flat=True).distinct()
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    return set(names)
+
+
+def _rows(identity):
+    return (
+        KVStore.objects.filter(key__startswith=add_prefix('', identity))
+        .values_list('key', 'value').iterator(chunk_size=CHUNK_SIZE)
+    )
+
+
+def scan_kvstore(images):
+    """Разбирает KV-хранилище sorl относительно живых картинок images.
+
+    Возвращает имена миниатюр, которые нужно сохранить, и ключи записей
+    о картинках и миниатюрах, которые больше никому не нужны.
+    """
+    storage = Post._meta.get_field('image').storage
+    live_sources = {ImageFile(name, storage).key for name in images}
+    live_thumbnails = set()
+    stale_keys = []
+    for key, value in _rows('thumbnails'):
+        if del_prefix(key) in live_sources:
+            live_thumbnails.update(deserialize(value))
+        else:
+            stale_keys.append(key)
+    kept = set()
+    for key, value in _rows('image'):
+        image_key = del_prefix(key)
+        if image_key in live_thumbnails:
+            kept.add(deserialize(value)['name'])
+        elif image_key not in live_sources:
+            stale_keys.append(key)
+    return kept, stale_keys
+
+
+def media_files(min_age):
+    """Обходит каталоги картинок и миниатюр, отдаёт (имя, размер).
+
+    Файлы моложе min_age секунд пропускаются: их пост или запись
+    в KV-хранилище может быть ещё не сохранена.
+    """
+    deadline = time.time() - min_age
+    roots = [
+        Post._meta.get_field('image').upload_to,
+        thumbnail_settings.THUMBNAIL_PREFIX,
+    ]
+    stack = [os.path.join(settings.MEDIA_ROOT, root) for root in roots]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except FileNotFoundError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                    continue
+                stat = entry.stat(follow_symlinks=False)
+                if stat.st_mtime > deadline:
+                    continue
+                name = os.path.relpath(entry.path, settings.MEDIA_ROOT)
+                yield name.replace(os.sep, '/'), stat.st_size
+
+
+def still_unused(names, min_age):
+    """Оставляет из names файлы, которые можно удалить прямо сейчас.
+
+    Пока команда обходила каталоги, картинку могли загрузить снова:
+    ContentHashStorage отдаёт старое имя и обновляет дату файла,
+    а новый пост ссылается на него.
+    """
+    deadline = time.time() - min_age
+    referenced = set(
+        Post.objects.filter(image__in=names).values_list('image', flat=True)
+    )
+    unused = []
+    for name in names:
+        if name in referenced:
+            continue
+        try:
+            mtime = os.stat(os.path.join(settings.MEDIA_ROOT, name)).st_mtime
+        except FileNotFoundError:
+            continue
+        if mtime <= deadline:
+            unused.append(name)
+    return unused
@@ -0,0 +1,74 @@
+# Generated by Django 2.2.16 on 2026-10-17 05:53
+
+from itertools import islice
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+BATCH_SIZE = 1000
+
+
+def _count(model, field, outer):
+    """Коррелированный подзапрос: число строк model для внешней записи."""
+    rows = (
+        model.objects.filter(**{field: models.OuterRef(outer)})
+        .order_by().values(field)
+        .annotate(total=models.Count('pk')).values('total')
+    )
+    return Coalesce(models.Subquery(rows), 0)
+
+
+def fill_counters(apps, schema_editor):
+    """Строки UserStats и счётчики, каждый своим UPDATE с подзапросом.
+
+    Один annotate с тремя Count(distinct=True) перемножал бы строки
+    постов и подписок пользователя в JOIN.
+    """
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    UserStats = apps.get_model('posts', 'UserStats')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    db = schema_editor.connection.alias
+    user_ids = User.objects.using(db).values_list('pk', flat=True).iterator()
+    while True:
+        batch = [UserStats(user_id=pk) for pk in islice(user_ids, BATCH_SIZE)]
+        if not batch:
+            break
+        UserStats.objects.using(db).bulk_create(batch)
+    stats = UserStats.objects.using(db)
+    stats.update(posts_count=_count(Post, 'author', 'user_id'))
+    stats.update(followers_count=_count(Follow, 'author', 'user_id'))
+    stats.update(following_count=_count(Follow, 'user', 'user_id'))
+    Post.objects.using(db).update(
+        comments_count=_count(Comment, 'post', 'pk')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0008_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.IntegerField(default=0, verbose_name='Посты')),
+                ('followers_count', models.IntegerField(default=0, verbose_name='Подписчики')),
+                ('following_count', models.IntegerField(default=0, verbose_name='Подписки')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Комментарии'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 2.2.16 on 2026-10-17 05:56
+
+from django.db import migrations, models
+
+
+def copy_pub_date(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    db = schema_editor.connection.alias
+    Post.objects.using(db).update(updated=models.F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Изменён'),
+        ),
+        migrations.RunPython(copy_pub_date, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 2.2.16 on 2026-10-17 06:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+import posts.models
+
+CREATE_SQL = (
+    """
+    CREATE VIRTUAL TABLE posts_post_fts USING fts5(
+        text, content='posts_post', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    # Счётчики и метки времени меняются часто, индекс трогаем только
+    # при правке текста.
+    """
+    CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')",
+)
+DROP_SQL = (
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TABLE IF EXISTS posts_post_fts',
+)
+
+
+def run_sql(statements):
+    def run(apps, schema_editor):
+        # FTS5 есть только в SQLite, на других базах поиск идёт без индекса.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostSearch',
+            fields=[
+                ('post', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='+', serialize=False, to='posts.Post')),
+                ('text', posts.models.SearchText()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'posts_post_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(run_sql(CREATE_SQL), run_sql(DROP_SQL)),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-17 09:40
+
+from django.db import migrations
+
+BATCH_SIZE = 500
+
+
+def fill_timelines(apps, schema_editor):
+    """Ленты для подписок, появившихся до таблицы TimelineEntry."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    db = schema_editor.connection.alias
+    follows = Follow.objects.using(db).values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator():
+        posts = Post.objects.using(db).filter(
+            author_id=author_id
+        ).values_list('pk', 'pub_date')
+        batch = []
+        for post_id, pub_date in posts.iterator():
+            batch.append(TimelineEntry(
+                user_id=user_id, post_id=post_id,
+                author_id=author_id, pub_date=pub_date,
+            ))
+            if len(batch) == BATCH_SIZE:
+                TimelineEntry.objects.using(db).bulk_create(
+                    batch, ignore_conflicts=True
+                )
+                batch = []
+        TimelineEntry.objects.using(db).bulk_create(
+            batch, ignore_conflicts=True
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 
+from .storage import ContentHashStorage
+
 User = get_user_model()
 
 
@@ -19,6 +21,7 @@ class Post(models.Model):
         help_text='Введите текст поста'
     )
     pub_date = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField('Изменён', auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -36,10 +39,24 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentHashStorage(),
         blank=True)
+    comments_count = models.IntegerField(
+        'Комментарии',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(fields=('-pub_date', '-id'),
+                         name='post_pub_date_idx'),
+            models.Index(fields=('author', '-pub_date', '-id'),
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=('group', '-pub_date', '-id'),
+                         name='post_group_pub_date_idx'),
+        )
 
     def __str__(self):
         return self.text[:15]
@@ -64,6 +81,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ('-created',)
+        indexes = (models.Index(
+            fields=('post', '-created', '-id'),
+            name='comment_post_created_idx'),)
 
 
 class Follow(models.Model):
@@ -81,3 +101,80 @@ class Follow(models.Model):
     class Meta:
         constraints = (models.UniqueConstraint(
             fields=('user', 'author'), name='unique_follow'),)
+        indexes = (models.Index(
+            fields=('author', 'user'), name='follow_author_user_idx'),)
+
+
+class UserStats(models.Model):
+    """Счётчики постов и подписок пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.IntegerField('Посты', default=0)
+    followers_count = models.IntegerField('Подписчики', default=0)
+    following_count = models.IntegerField('Подписки', default=0)
+
+
+class TimelineEntry(models.Model):
+    """Пост автора в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = (models.UniqueConstraint(
+            fields=('user', 'post'), name='unique_timeline_entry'),)
+        indexes = (models.Index(
+            fields=('user', '-pub_date', '-post'),
+            name='timeline_user_pub_date_idx'),)
+
+
+class SearchText(models.TextField):
+    """Колонка полнотекстового индекса с lookup match."""
+
+
+@SearchText.register_lookup
+class Match(models.Lookup):
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} MATCH {rhs}', lhs_params + rhs_params
+
+
+class PostSearch(models.Model):
+    """Строка FTS5-индекса текстов постов (SQLite).
+
+    Таблица создаётся миграцией и обновляется триггерами на posts_post.
+    Поле rank доступно только в запросах с match.
+    """
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='+'
+    )
+    text = SearchText()
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'posts_post_fts'
@@ -0,0 +1,244 @@
+import math
+
+from django.core.exceptions import FieldDoesNotExist
+from django.core.paginator import EmptyPage, InvalidPage, Page, Paginator
+from django.db import DatabaseError, connections
+from django.db.models import DateField, Q
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+
+def encode_cursor(value, pk):
+    """Упаковывает ключ (дата или число, id) записи в строку для URL."""
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    else:
+        value = repr(float(value))
+    raw = f'{value}|{pk}'
+    return urlsafe_base64_encode(raw.encode())
+
+
+# Номера дальше этого не ходят в OFFSET: такие страницы пусты
+# на любой ленте, а огромное число SQLite не принимает.
+MAX_PAGE_NUMBER = 10 ** 6
+# Предел INTEGER в SQLite и bigint в PostgreSQL.
+MAX_PK = 2 ** 63 - 1
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+def decode_cursor(cursor):
+    """Распаковывает курсор; для испорченного курсора возвращает None."""
+    if not cursor:
+        return None
+    try:
+        raw, pk = urlsafe_base64_decode(cursor).decode().split('|')
+        pk = int(pk)
+        value = parse_datetime(raw)
+        if value is None:
+            value = float(raw)
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return value, pk
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (field, pk) без COUNT(*) и OFFSET.
+
+    Соседние страницы адресуются курсорами `?after=` и `?before=`,
+    поэтому глубина страницы не влияет на стоимость запроса. Старые
+    ссылки `?page=N` и `?page=last` продолжают работать.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date',
+                 pk_field='pk'):
+        self.field = field
+        self.pk_field = pk_field
+        self.ordering = (f'-{field}', f'-{pk_field}')
+        self.reverse_ordering = (field, pk_field)
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    def cursor_page(self, params):
+        """Возвращает страницу по параметрам запроса (request.GET).
+
+        Для курсора, который не разбирается или не подходит к полю
+        сортировки, бросает InvalidCursor.
+        """
+        after = self.validate_cursor(params.get('after'))
+        if after is not None:
+            return self._keyset_page(after, older=True)
+        before = self.validate_cursor(params.get('before'))
+        if before is not None:
+            return self._keyset_page(before, older=False)
+        number = params.get('page')
+        if number == 'last':
+            return self._last_page()
+        try:
+            number = min(max(int(number), 1), MAX_PAGE_NUMBER)
+        except (TypeError, ValueError):
+            number = 1
+        return self._offset_page(number)
+
+    def validate_cursor(self, cursor):
+        """Курсор из запроса: None, если его нет, или (значение, id)."""
+        if not cursor:
+            return None
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            raise InvalidCursor('Курсор не разбирается')
+        value, pk = decoded
+        if not 0 < pk <= MAX_PK:
+            raise InvalidCursor('Неверный id в курсоре')
+        if self._orders_by_date():
+            if not hasattr(value, 'isoformat'):
+                raise InvalidCursor('Курсор ленты должен содержать дату')
+        elif hasattr(value, 'isoformat') or not math.isfinite(value):
+            raise InvalidCursor('Курсор должен содержать число')
+        return decoded
+
+    def _orders_by_date(self):
+        try:
+            field = self.object_list.model._meta.get_field(self.field)
+        except FieldDoesNotExist:
+            # Аннотации вроде оценки поиска — числа.
+            return False
+        return isinstance(field, DateField)
+
+    def _keyset_page(self, cursor, older):
+        value, pk = cursor
+        if older:
+            lookup, ordering = 'lt', self.ordering
+        else:
+            lookup, ordering = 'gt', self.reverse_ordering
+        condition = (
+            Q(**{f'{self.field}__{lookup}': value})
+            | Q(**{self.field: value, f'{self.pk_field}__{lookup}': pk})
+        )
+        rows = list(
+            self.object_list.filter(condition)
+            .order_by(*ordering)[:self.per_page + 1]
+        )
+        if not rows and not older:
+            # Новее курсора ничего нет: это начало ленты.
+            return self._offset_page(1)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if older:
+            # После последней записи страница просто пустая.
+            return self._build_page(rows, has_previous=True,
+                                    has_next=has_more)
+        return self._build_page(rows[::-1], has_previous=has_more,
+                                has_next=True)
+
+    def _last_page(self):
+        rows = list(
+            self.object_list.order_by(*self.reverse_ordering)
+            [:self.per_page + 1]
+        )
+        has_previous = len(rows) > self.per_page
+        return self._build_page(rows[:self.per_page][::-1],
+                                has_previous=has_previous, has_next=False)
+
+    def _offset_page(self, number):
+        # OFFSET остаётся только для старых ссылок `?page=N`.
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            return self._offset_page(1)
+        return self._build_page(
+            rows[:self.per_page],
+            has_previous=number > 1,
+            has_next=len(rows) > self.per_page,
+            number=number,
+        )
+
+    def _cursor_for(self, row):
+        # Строки из values() приходят словарями, а не объектами моделей.
+        if isinstance(row, dict):
+            return encode_cursor(row[self.field], row[self.pk_field])
+        return encode_cursor(
+            getattr(row, self.field), getattr(row, self.pk_field)
+        )
+
+    def _build_page(self, rows, has_previous, has_next, number=None):
+        if not rows:
+            has_previous = has_next = False
+        if number is None:
+            number = 2 if has_previous else 1
+        # Page сверяет номер с num_pages, поэтому число страниц задаётся
+        # относительно текущей, без подсчёта всех записей.
+        self.num_pages = number + 1 if has_next else number
+        page = Page(rows, number, self)
+        page.previous_cursor = (
+            self._cursor_for(rows[0]) if has_previous else None
+        )
+        page.next_cursor = self._cursor_for(rows[-1]) if has_next else None
+        return page
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для админки без полного COUNT(*) по большой таблице.
+
+    Строки считаются с ограничением COUNT_LIMIT. Если предел достигнут,
+    для таблицы без фильтров число берётся из статистики SQLite
+    (sqlite_stat1 после ANALYZE). Страницы дальше оценки открываются
+    по номеру, пока в них есть строки.
+    """
+    COUNT_LIMIT = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        counted = queryset.order_by()[:self.COUNT_LIMIT].count()
+        if counted < self.COUNT_LIMIT or queryset.query.where:
+            return counted
+        # Статистика бывает устаревшей, поэтому не меньше посчитанного.
+        estimate = estimate_rows(queryset.model, queryset.db)
+        return max(estimate or 0, counted)
+
+    def validate_number(self, number):
+        try:
+            return super().validate_number(number)
+        except EmptyPage:
+            if self.count < self.COUNT_LIMIT:
+                raise
+            # Число строк неточное: пустоту страницы проверит page().
+            number = int(number)
+            if number < 1:
+                raise
+            return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if number <= self.num_pages:
+            return super().page(number)
+        bottom = (number - 1) * self.per_page
+        page = self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self
+        )
+        if not page.object_list:
+            raise EmptyPage('Страница не содержит результатов')
+        return page
+
+
+def estimate_rows(model, using):
+    """Оценка числа строк таблицы по статистике SQLite или None."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+    except DatabaseError:
+        # ANALYZE ещё не запускали, таблицы статистики нет.
+        return None
+    if row is None or not row[0]:
+        return None
+    return int(row[0].split()[0])
@@ -0,0 +1,63 @@
+import re
+
+from django.db import connection
+from django.db.models import F
+
+from .models import Post, PostSearch
+from .paginators import CursorPaginator
+
+MAX_TERMS = 10
+TERM_RE = re.compile(r'\w+')
+
+
+def enabled():
+    """FTS5-индекс есть только в SQLite."""
+    return connection.vendor == 'sqlite'
+
+
+def fts_query(query):
+    """Переводит ввод пользователя в запрос FTS5.
+
+    Берутся только слова, каждое ищется по префиксу; операторы
+    и кавычки из ввода не попадают в синтаксис FTS5.
+    """
+    terms = TERM_RE.findall(query)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def matching(query):
+    """Строки индекса, подходящие под запрос, с оценкой score.
+
+    bm25 в SQLite тем меньше, чем лучше совпадение, поэтому score —
+    это rank со знаком минус и сортируется как обычное поле по убыванию.
+    """
+    return PostSearch.objects.filter(
+        text__match=fts_query(query)
+    ).annotate(score=-F('rank'))
+
+
+def post_ids(query):
+    """Подзапрос с id постов, подходящих под запрос."""
+    if not enabled():
+        return Post.objects.filter(text__icontains=query).values('pk')
+    return matching(query).values('post_id')
+
+
+def search_page(query, params, per_page):
+    """Страница результатов поиска: посты от лучшего совпадения к худшему.
+
+    Для запроса без единого слова возвращает None.
+    """
+    if not fts_query(query):
+        return None
+    if not enabled():
+        posts = Post.objects.filter(
+            text__icontains=query
+        ).select_related('author', 'group')
+        return CursorPaginator(posts, per_page).cursor_page(params)
+    rows = matching(query).select_related('post__author', 'post__group')
+    page = CursorPaginator(
+        rows, per_page, field='score', pk_field='post_id'
+    ).cursor_page(params)
+    page.object_list = [row.post for row in page.object_list]
+    return page
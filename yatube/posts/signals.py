@@ -0,0 +1,97 @@
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import caching, counters, timelines
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def post_scopes(post):
+    return (
+        'index',
+        f'post:{post.pk}',
+        f'profile:{post.author.username}',
+        f'group:{post.group.slug}' if post.group_id else None,
+    )
+
+
+def comment_scopes(comment):
+    # Число комментариев показывают страница поста и списки постов
+    # API; HTML-ленты его не выводят и от комментариев не сбрасываются.
+    return (f'post:{comment.post_id}', 'comments')
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+        caching.bump(f'profile:{instance.username}')
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, **kwargs):
+    # Пост мог уйти из старой группы, её страницу тоже нужно сбросить.
+    instance._old_group_slug = Post.objects.filter(
+        pk=instance.pk
+    ).values_list('group__slug', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        timelines.fan_out_post(instance)
+    old_slug = getattr(instance, '_old_group_slug', None)
+    caching.bump(
+        *post_scopes(instance), f'group:{old_slug}' if old_slug else None
+    )
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+    caching.bump(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments(instance.post_id, 1)
+    caching.bump(*comment_scopes(instance))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_comments(instance.post_id, -1)
+    caching.bump(*comment_scopes(instance))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    # Название и адрес группы выводятся почти на всех страницах;
+    # карточки её постов сменят ключ сами, он включает эти поля.
+    caching.bump('groups')
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user(instance.user_id, 'following_count', 1)
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        timelines.add_author(instance.user_id, instance.author_id)
+        caching.bump(
+            f'profile:{instance.user.username}',
+            f'profile:{instance.author.username}',
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.user_id, 'following_count', -1)
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    timelines.remove_author(instance.user_id, instance.author_id)
+    caching.bump(
+        f'profile:{instance.user.username}',
+        f'profile:{instance.author.username}',
+    )
@@ -0,0 +1,40 @@
+import hashlib
+import os
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """Хранилище, где имя файла — sha256 его содержимого.
+
+    Одинаковые загрузки получают одно имя и один файл на диске,
+    а значит и общий набор миниатюр sorl. Повторная загрузка обновляет
+    дату изменения файла, чтобы gc_media не принял его за старый мусор.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        return os.path.join(directory, digest.hexdigest() + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            try:
+                os.utime(self.path(name))
+            except FileNotFoundError:
+                # Файл успели удалить между проверкой и обновлением даты.
+                return super().save(name, content, max_length=max_length)
+            return name
+        return super().save(name, content, max_length=max_length)
@@ -0,0 +1,59 @@
+import hashlib
+
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+CARD_TIMEOUT = 60 * 60 * 24
+# Карточка с оригиналом вместо ещё не готовых миниатюр.
+PENDING_CARD_TIMEOUT = 60
+
+
+def card_key(post):
+    """Ключ карточки: id поста, метка его правки и подписи в карточке.
+
+    Имя автора и название группы меняются без правки поста, поэтому
+    их отпечаток тоже входит в ключ. Автор и группа уже загружены
+    через select_related, лишних запросов нет.
+    """
+    group = post.group
+    shown = '|'.join((
+        post.author.username,
+        post.author.get_full_name(),
+        group.slug if group else '',
+        group.title if group else '',
+    ))
+    digest = hashlib.md5(shown.encode()).hexdigest()
+    return f'post_card:{post.pk}:{post.updated.timestamp()}:{digest}'
+
+
+@register.simple_tag
+def post_cards(posts):
+    """Возвращает HTML карточек постов, взятых из кеша одним get_many.
+
+    Недостающие карточки рендерятся и кладутся в кеш одним set_many;
+    карточки без готовых миниатюр живут в кеше недолго.
+    """
+    keys = [card_key(post) for post in posts]
+    cards = cache.get_many(keys)
+    missing, pending = {}, {}
+    for key, post in zip(keys, posts):
+        if key in cards:
+            continue
+        card = {}
+        html = render_to_string(CARD_TEMPLATE, {'post': post, 'card': card})
+        if card.get('thumbnails_pending'):
+            pending[key] = html
+        else:
+            missing[key] = html
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+    if pending:
+        cache.set_many(pending, PENDING_CARD_TIMEOUT)
+    cards.update(missing)
+    cards.update(pending)
+    return [mark_safe(cards[key]) for key in keys]
@@ -0,0 +1,39 @@
+from django import template
+
+from ..thumbnails import FEED_DEFAULT, FEED_GEOMETRIES, cached_thumbnail
+
+register = template.Library()
+
+FEED_SIZES = '(min-width: 992px) 860px, 100vw'
+
+
+@register.inclusion_tag('posts/includes/feed_image.html', takes_context=True)
+def feed_image(context, image):
+    """Картинка карточки: набор миниатюр для srcset вместо оригинала.
+
+    Миниатюры только ищутся в KV-хранилище sorl. Пока thumbnails.schedule
+    их не создал, отдаётся оригинал, а карточка помечается в context['card'],
+    чтобы post_cards не кешировал её надолго.
+    """
+    if not image:
+        return {}
+    thumbnails = {
+        geometry: cached_thumbnail(image, geometry)
+        for geometry in FEED_GEOMETRIES
+    }
+    if not all(thumbnails.values()):
+        context.get('card', {})['thumbnails_pending'] = True
+        return {'src': image.url}
+    # С crop и upscale миниатюра всегда ровно заданного размера, поэтому
+    # ширину и высоту берём из геометрии, не открывая файл.
+    width, height = FEED_DEFAULT.split('x')
+    return {
+        'src': thumbnails[FEED_DEFAULT].url,
+        'width': width,
+        'height': height,
+        'srcset': ', '.join(
+            f'{thumbnail.url} {geometry.split("x")[0]}w'
+            for geometry, thumbnail in thumbnails.items()
+        ),
+        'sizes': FEED_SIZES,
+    }
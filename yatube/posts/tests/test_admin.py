@@ -0,0 +1,147 @@
+from unittest import mock
+
+from django.contrib.admin import helpers
+from django.contrib.auth import get_user_model
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import caching
+from ..models import Comment, Follow, Group, Post
+from ..paginators import EstimatedCountPaginator
+
+User = get_user_model()
+
+
+class AdminTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="pass"
+        )
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def grow(self, count):
+        for i in range(count):
+            user = User.objects.create_user(
+                username=f"user{User.objects.count()}"
+            )
+            post = Post.objects.create(
+                author=user, text="пост", group=self.group
+            )
+            Comment.objects.create(post=post, author=self.admin, text="-")
+            Follow.objects.create(user=user, author=self.admin)
+
+    def changelist_queries(self, model):
+        url = reverse(f"admin:posts_{model}_changelist")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return [query["sql"] for query in queries.captured_queries]
+
+    def test_changelists_do_not_grow_with_rows(self):
+        """Списки в админке не делают запрос на каждую строку"""
+        for model in ("post", "comment", "follow"):
+            with self.subTest(model=model):
+                self.grow(2)
+                small = len(self.changelist_queries(model))
+                self.grow(10)
+                self.assertEqual(len(self.changelist_queries(model)), small)
+
+    def test_no_full_count(self):
+        """Число строк считается с ограничением, без полного COUNT(*)"""
+        self.grow(3)
+        for model in ("post", "comment", "follow"):
+            with self.subTest(model=model):
+                counts = [
+                    sql for sql in self.changelist_queries(model)
+                    if "COUNT(" in sql
+                ]
+                self.assertTrue(counts)
+                self.assertTrue(all("LIMIT" in sql for sql in counts))
+
+    def test_change_forms_use_raw_id_widgets(self):
+        """Формы комментария и подписки не выводят списки всех записей"""
+        self.grow(1)
+        cases = {
+            "comment": Comment.objects.first().pk,
+            "follow": Follow.objects.first().pk,
+        }
+        for model, pk in cases.items():
+            with self.subTest(model=model):
+                response = self.client.get(
+                    reverse(f"admin:posts_{model}_change", args=[pk])
+                )
+                self.assertContains(response, "vForeignKeyRawIdAdminField")
+                self.assertNotContains(response, "<option")
+
+    def test_move_to_group_is_one_update(self):
+        """Перенос постов в группу выполняет один UPDATE"""
+        self.grow(5)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse("admin:posts_post_changelist"), {
+                "action": "move_to_group",
+                "index": 0,
+                "group": "",
+                helpers.ACTION_CHECKBOX_NAME: list(
+                    Post.objects.values_list("pk", flat=True)
+                ),
+            })
+        updates = [
+            query["sql"] for query in queries.captured_queries
+            if query["sql"].startswith('UPDATE "posts_post"')
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+
+    def test_delete_comments_keeps_counters(self):
+        """Массовое удаление комментариев пересчитывает счётчики постов"""
+        self.grow(3)
+        post = Post.objects.first()
+        Comment.objects.create(post=post, author=self.admin, text="ещё")
+        scopes = (f"post:{post.pk}", "comments")
+        versions = caching.get_versions(*scopes)
+        index = caching.get_versions("index")
+        self.client.post(reverse("admin:posts_comment_changelist"), {
+            "action": "delete_comments",
+            "index": 0,
+            helpers.ACTION_CHECKBOX_NAME: list(
+                Comment.objects.filter(post=post)
+                .values_list("pk", flat=True)
+            ),
+        })
+        self.assertFalse(Comment.objects.filter(post=post).exists())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(Comment.objects.count(), 2)
+        for old, new in zip(versions, caching.get_versions(*scopes)):
+            self.assertGreater(new, old)
+        self.assertEqual(caching.get_versions("index"), index)
+
+    def test_pages_past_count_limit(self):
+        """Страницы дальше предела подсчёта открываются, пока есть строки"""
+        self.grow(5)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        queryset = Post.objects.order_by("pk")
+        with mock.patch.object(EstimatedCountPaginator, "COUNT_LIMIT", 2):
+            paginator = EstimatedCountPaginator(queryset, 2)
+            self.assertEqual(paginator.count, 5)
+            self.assertEqual(len(paginator.page(3).object_list), 1)
+            filtered = EstimatedCountPaginator(
+                queryset.filter(group=self.group), 2
+            )
+            self.assertEqual(filtered.count, 2)
+            self.assertEqual(len(filtered.page(3).object_list), 1)
+            with self.assertRaises(EmptyPage):
+                filtered.page(4)
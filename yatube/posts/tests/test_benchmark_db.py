@@ -0,0 +1,19 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Post
+
+
+class BenchmarkDbTests(TestCase):
+    def test_compares_modes_on_copy(self):
+        """Бенчмарк сравнивает оба режима и не трогает рабочую базу"""
+        out = StringIO()
+        call_command("benchmark_db", threads=2, seconds=0.2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("без настроек: чтений"))
+        self.assertTrue(lines[1].startswith("SQLITE_PRAGMAS: чтений"))
+        self.assertFalse(Post.objects.exists())
+        self.assertFalse(Comment.objects.exists())
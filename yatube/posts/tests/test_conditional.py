@@ -0,0 +1,91 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="egor")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug",
+            description="Тестовое описание",
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text="Тестовый пост", group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def urls(self):
+        return [
+            reverse("posts:index"),
+            reverse("posts:group_posts", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.user.username]),
+            reverse("posts:post_detail", args=[self.post.pk]),
+        ]
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Неизменённая страница отдаёт 304 по ETag и Last-Modified"""
+        for url in self.urls():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                by_etag = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=response["ETag"]
+                )
+                by_date = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+                )
+                self.assertEqual(by_etag.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                self.assertEqual(by_date.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+
+    def test_not_modified_without_queries_or_render(self):
+        """Ответ 304 для ленты не ходит в базу и не рендерит шаблон"""
+        url = reverse("posts:index")
+        etag = self.client.get(url)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        self.assertEqual(len(queries), 0)
+        self.assertIsNone(response.context)
+
+    def test_changes_and_other_users_get_new_etag(self):
+        """Новый комментарий и другой пользователь меняют ETag"""
+        url = reverse("posts:post_detail", args=[self.post.pk])
+        etag = self.client.get(url)["ETag"]
+        Comment.objects.create(post=self.post, author=self.user, text="Да")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response["ETag"], etag)
+        etag = response["ETag"]
+        self.client.force_login(self.user)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_login_ignores_if_modified_since(self):
+        """После входа If-Modified-Since анонимной страницы не даёт 304"""
+        for url in self.urls():
+            with self.subTest(url=url):
+                self.client.logout()
+                last_modified = self.client.get(url)["Last-Modified"]
+                self.client.force_login(self.user)
+                response = self.client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertFalse(response.has_header("Last-Modified"))
@@ -0,0 +1,124 @@
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, UserStats
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="writer")
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counter(self):
+        """Счётчик постов растёт при публикации и падает при удалении"""
+        post = Post.objects.create(author=self.author, text="пост")
+        Post.objects.create(author=self.author, text="пост")
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_comment_counter(self):
+        """Счётчик комментариев поста следует за комментариями"""
+        post = Post.objects.create(author=self.author, text="пост")
+        self.client.post(
+            reverse("posts:add_comment", args=[post.pk]), {"text": "ок"}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.filter(post=post).delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_follow_counters(self):
+        """Подписка меняет счётчики подписчиков и подписок"""
+        self.client.get(reverse("posts:profile_follow", args=[self.author]))
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.client.get(
+            reverse("posts:profile_unfollow", args=[self.author])
+        )
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+
+    def test_edit_keeps_comment_counter(self):
+        """Редактирование поста не затирает счётчик комментариев"""
+        post = Post.objects.create(author=self.reader, text="пост")
+        Comment.objects.create(post=post, author=self.author, text="ок")
+        self.client.post(
+            reverse("posts:post_edit", args=[post.pk]), {"text": "правка"}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.text, "правка")
+        self.assertEqual(post.comments_count, 1)
+
+    def test_recount_repairs_drift(self):
+        """recount_stats исправляет разошедшиеся счётчики"""
+        post = Post.objects.create(author=self.author, text="пост")
+        Comment.objects.create(post=post, author=self.reader, text="ок")
+        Follow.objects.create(user=self.reader, author=self.author)
+        UserStats.objects.update(
+            posts_count=7, followers_count=7, following_count=7
+        )
+        UserStats.objects.filter(user=self.reader).delete()
+        Post.objects.update(comments_count=7)
+        call_command("recount_stats", chunk_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        author, reader = self.stats(self.author), self.stats(self.reader)
+        self.assertEqual(
+            (author.posts_count, author.followers_count,
+             author.following_count),
+            (1, 1, 0),
+        )
+        self.assertEqual(
+            (reader.posts_count, reader.followers_count,
+             reader.following_count),
+            (0, 0, 1),
+        )
+
+    def test_migration_fills_counters(self):
+        """Миграция заполняет счётчики без перемножения строк в JOIN"""
+        for _ in range(2):
+            post = Post.objects.create(author=self.author, text="пост")
+            Comment.objects.create(post=post, author=self.reader, text="ок")
+        Comment.objects.create(post=post, author=self.author, text="ещё")
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.author, author=self.reader)
+        UserStats.objects.all().delete()
+        Post.objects.update(comments_count=0)
+        migration = import_module("posts.migrations.0009_counters")
+        migration.fill_counters(apps, SimpleNamespace(connection=connection))
+        author, reader = self.stats(self.author), self.stats(self.reader)
+        self.assertEqual(
+            (author.posts_count, author.followers_count,
+             author.following_count),
+            (2, 1, 1),
+        )
+        self.assertEqual(
+            (reader.posts_count, reader.followers_count,
+             reader.following_count),
+            (0, 1, 1),
+        )
+        self.assertEqual(
+            sorted(Post.objects.values_list("comments_count", flat=True)),
+            [1, 2],
+        )
@@ -0,0 +1,97 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..feeds import FEED_COUNT
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="egor")
+        cls.other = User.objects.create_user(username="other")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug",
+            description="Тестовое описание",
+        )
+        cls.group_post = Post.objects.create(
+            author=cls.author, text="Пост в группе", group=cls.group
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.other, text="Пост без группы"
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def feeds(self):
+        return {
+            "index": (reverse("posts:index_rss"), reverse("posts:index_atom")),
+            "group": (
+                reverse("posts:group_rss", args=[self.group.slug]),
+                reverse("posts:group_atom", args=[self.group.slug]),
+            ),
+            "profile": (
+                reverse("posts:profile_rss", args=[self.other.username]),
+                reverse("posts:profile_atom", args=[self.other.username]),
+            ),
+        }
+
+    def test_feeds_contain_their_posts(self):
+        """Ленты отдают RSS и Atom только со своими постами"""
+        expected = {
+            "index": {"Пост в группе", "Пост без группы"},
+            "group": {"Пост в группе"},
+            "profile": {"Пост без группы"},
+        }
+        for name, urls in self.feeds().items():
+            for url, content_type in zip(urls, ("rss", "atom")):
+                with self.subTest(url=url):
+                    response = self.client.get(url)
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+                    self.assertIn(content_type, response["Content-Type"])
+                    content = response.content.decode()
+                    for text in {"Пост в группе", "Пост без группы"}:
+                        self.assertEqual(
+                            f"<title>{text}</title>" in content,
+                            text in expected[name],
+                        )
+
+    def test_feed_is_limited(self):
+        """В ленте не больше FEED_COUNT записей"""
+        Post.objects.bulk_create(
+            Post(author=self.author, text=f"Пост {i}")
+            for i in range(FEED_COUNT)
+        )
+        response = self.client.get(reverse("posts:index_rss"))
+        self.assertEqual(response.content.count(b"<item>"), FEED_COUNT)
+
+    def test_feed_cached_and_invalidated_by_new_post(self):
+        """Лента кешируется, отдаёт 304 и обновляется после нового поста"""
+        url = reverse("posts:group_atom", args=[self.group.slug])
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(
+            author=self.other, text="Свежий пост", group=self.group
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn("Свежий пост", response.content.decode())
+
+    def test_unknown_group_or_author_is_404(self):
+        """Лента несуществующей группы или автора отдаёт 404"""
+        for url in (reverse("posts:group_rss", args=["missing"]),
+                    reverse("posts:profile_atom", args=["missing"])):
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.client.get(url).status_code, HTTPStatus.NOT_FOUND
+                )
@@ -12,7 +12,7 @@ from ..models import Post, Group, User, Comment
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_ASYNC=False)
 class PostFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
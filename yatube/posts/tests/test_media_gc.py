@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.models import KVStore
+
+from .. import media_gc, thumbnails
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def small_gif(color):
+    return (
+        b"\x47\x49\x46\x38\x39\x61\x02\x00"
+        b"\x01\x00\x80\x00\x00\x00\x00\x00"
+        + color
+        + b"\x21\xF9\x04\x00\x00"
+        b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+        b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+        b"\x0A\x00\x3B"
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class MediaGarbageCollectorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="egor")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.live = self.create_post(b"\xFF\xFF\xFF")
+        self.dead = self.create_post(b"\x00\xFF\x00")
+        self.dead_files = self.files() - self.live_files()
+        self.dead.delete()
+        orphan = os.path.join(TEMP_MEDIA_ROOT, "posts", "orphan.gif")
+        with open(orphan, "wb") as file:
+            file.write(small_gif(b"\x00\x00\xFF"))
+        self.dead_files.add("posts/orphan.gif")
+
+    def create_post(self, color):
+        post = Post(author=self.user, text="пост")
+        post.image.save("small.gif", ContentFile(small_gif(color)))
+        thumbnails.generate(post.image)
+        return post
+
+    def files(self):
+        found = set()
+        for root, _, names in os.walk(TEMP_MEDIA_ROOT):
+            for name in names:
+                path = os.path.relpath(os.path.join(root, name),
+                                       TEMP_MEDIA_ROOT)
+                found.add(path.replace(os.sep, "/"))
+        return found
+
+    def live_files(self):
+        return {self.live.image.name} | {
+            get_thumbnail(self.live.image, geometry, **options).name
+            for geometry, options in thumbnails.THUMBNAIL_GEOMETRIES
+        }
+
+    def test_dry_run_keeps_files(self):
+        """Пробный запуск только считает мусор"""
+        before = self.files()
+        out = StringIO()
+        call_command("gc_media", dry_run=True, min_age=0, stdout=out)
+        self.assertEqual(self.files(), before)
+        self.assertIn(f"Будет удалено файлов: {len(self.dead_files)}",
+                      out.getvalue())
+
+    def test_removes_unreferenced_files(self):
+        """Удаляются файлы удалённых постов, их миниатюры и сироты"""
+        kv_rows = KVStore.objects.count()
+        call_command("gc_media", min_age=0, batch_size=2, stdout=StringIO())
+        self.assertEqual(self.files(), self.live_files())
+        self.assertEqual(
+            KVStore.objects.count(),
+            kv_rows - len(thumbnails.THUMBNAIL_GEOMETRIES) - 2,
+        )
+
+    def test_fresh_files_are_skipped(self):
+        """Недавние файлы не удаляются, пока не истечёт min_age"""
+        before = self.files()
+        call_command("gc_media", stdout=StringIO())
+        self.assertEqual(self.files(), before)
+
+    def test_file_uploaded_again_during_run_is_kept(self):
+        """Картинку, загруженную снова во время обхода, gc не удаляет"""
+        scan_kvstore = media_gc.scan_kvstore
+
+        def upload_again(images):
+            result = scan_kvstore(images)
+            self.create_post(b"\x00\xFF\x00")
+            return result
+
+        with mock.patch.object(media_gc, "scan_kvstore", upload_again):
+            call_command("gc_media", min_age=0, stdout=StringIO())
+        self.assertIn(self.dead.image.name, self.files())
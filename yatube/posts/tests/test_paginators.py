@@ -0,0 +1,177 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlsafe_base64_encode
+
+from ..models import Comment, Post, Group
+from ..paginators import encode_cursor
+from ..views import COMMENTS_COUNT, PAGINATOR_COUNT
+
+User = get_user_model()
+POSTS_COUNT = 13
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="egor")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.author, text=f"Тестовый текст {i}",
+                 group=cls.group)
+            for i in range(POSTS_COUNT)
+        )
+        # Одинаковая дата проверяет, что порядок добивается по id.
+        first = Post.objects.order_by("pk").first()
+        Post.objects.filter(pk__lte=first.pk + 5).update(
+            pub_date=first.pub_date
+        )
+        cls.urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", kwargs={"slug": cls.group.slug}),
+            reverse("posts:profile", kwargs={"username": cls.author}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def walk(self, url):
+        """Собирает все посты, переходя по курсору `after`."""
+        seen = []
+        params = {}
+        while True:
+            response = self.client.get(url, params)
+            page = response.context["page_obj"]
+            seen.extend(post.pk for post in page)
+            if not page.has_next():
+                return seen
+            params = {"after": page.next_cursor}
+
+    def test_cursor_walk_returns_every_post_once(self):
+        """Курсор проходит все посты по порядку и без повторов"""
+        expected = list(
+            Post.objects.order_by("-pub_date", "-pk")
+            .values_list("pk", flat=True)
+        )
+        for url in self.urls:
+            with self.subTest(url=url):
+                cache.clear()
+                self.assertEqual(self.walk(url), expected)
+
+    def test_before_cursor_returns_previous_page(self):
+        """Курсор `before` возвращает предыдущую страницу"""
+        first = self.client.get(self.urls[1]).context["page_obj"]
+        second = self.client.get(
+            self.urls[1], {"after": first.next_cursor}
+        ).context["page_obj"]
+        self.assertEqual(len(second), POSTS_COUNT - PAGINATOR_COUNT)
+        back = self.client.get(
+            self.urls[1], {"before": second.previous_cursor}
+        ).context["page_obj"]
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_legacy_page_numbers(self):
+        """Старые ссылки `?page=N` и `?page=last` продолжают работать"""
+        cases = {
+            "2": POSTS_COUNT - PAGINATOR_COUNT,
+            "last": PAGINATOR_COUNT,
+            "100": PAGINATOR_COUNT,
+            "abc": PAGINATOR_COUNT,
+        }
+        for number, expected in cases.items():
+            with self.subTest(page=number):
+                response = self.client.get(self.urls[1], {"page": number})
+                self.assertEqual(len(response.context["page_obj"]), expected)
+
+    def test_broken_cursor_returns_404(self):
+        """Испорченный или чужой по типу курсор — 404, а не ошибка"""
+        cases = (
+            {"after": "broken"},
+            {"after": encode_cursor(1.5, 3)},
+            {"before": encode_cursor(1.5, 3)},
+            {"after": urlsafe_base64_encode(b"nan|3")},
+            {"after": urlsafe_base64_encode(b"1.5|99999999999999999999")},
+        )
+        for params in cases:
+            with self.subTest(params=params):
+                response = self.client.get(self.urls[1], params)
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_huge_page_number_and_cursor_past_end(self):
+        """Огромный номер страницы и курсор за концом ленты не ломают её"""
+        response = self.client.get(
+            self.urls[1], {"page": "99999999999999999999"}
+        )
+        self.assertEqual(len(response.context["page_obj"]), PAGINATOR_COUNT)
+        last = Post.objects.order_by("pub_date", "pk").first()
+        page = self.client.get(
+            self.urls[1], {"after": encode_cursor(last.pub_date, last.pk)}
+        ).context["page_obj"]
+        self.assertEqual(len(page), 0)
+        self.assertFalse(page.has_next())
+
+    def test_no_count_query(self):
+        """Страницы ленты не выполняют COUNT(*)"""
+        first = self.client.get(self.urls[1]).context["page_obj"]
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.urls[1], {"after": first.next_cursor})
+        self.assertFalse(
+            any("COUNT(" in query["sql"] for query in queries.captured_queries)
+        )
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="egor")
+        cls.post = Post.objects.create(author=cls.author, text="Пост")
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text=f"Ответ {i}")
+            for i in range(COMMENTS_COUNT + 5)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_detail_shows_first_comment_page(self):
+        """На странице поста только первая страница комментариев"""
+        response = self.client.get(
+            reverse("posts:post_detail", args=[self.post.pk])
+        )
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), COMMENTS_COUNT)
+        self.assertContains(
+            response,
+            reverse("posts:post_comments", args=[self.post.pk])
+            + f"?after={comments.next_cursor}",
+        )
+
+    def test_fragment_returns_next_comments(self):
+        """Фрагмент комментариев отдаёт следующую страницу"""
+        first = self.client.get(
+            reverse("posts:post_detail", args=[self.post.pk])
+        ).context["comments"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("posts:post_comments", args=[self.post.pk]),
+                {"after": first.next_cursor},
+            )
+        self.assertEqual(len(queries), 1)
+        self.assertTemplateUsed(response, "posts/includes/comments.html")
+        rest = response.context["comments"]
+        self.assertEqual(len(rest), 5)
+        self.assertFalse(set(rest) & set(first))
+        self.assertNotContains(response, "data-more-comments")
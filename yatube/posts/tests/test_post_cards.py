@@ -0,0 +1,87 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import caching
+from ..models import Group, Post
+from ..templatetags.post_cards import CARD_TEMPLATE
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="egor")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        for i in range(3):
+            Post.objects.create(
+                author=cls.user, text=f"Пост {i}", group=cls.group
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def rendered_cards(self, url):
+        response = self.client.get(url)
+        return [
+            template for template in response.templates
+            if template.name == CARD_TEMPLATE
+        ]
+
+    def test_cards_are_shared_between_pages(self):
+        """Карточки, собранные на главной, переиспользуются другими лентами"""
+        self.assertEqual(len(self.rendered_cards(reverse("posts:index"))), 3)
+        urls = (
+            reverse("posts:group_posts", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.user]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.rendered_cards(url), [])
+
+    def test_edit_rerenders_only_edited_card(self):
+        """Правка поста перерисовывает только его карточку"""
+        self.rendered_cards(reverse("posts:index"))
+        post = Post.objects.first()
+        self.client.post(
+            reverse("posts:post_edit", args=[post.pk]),
+            {"text": "Исправленный текст", "group": self.group.pk},
+        )
+        response = self.client.get(reverse("posts:index"))
+        cards = [
+            template for template in response.templates
+            if template.name == CARD_TEMPLATE
+        ]
+        self.assertEqual(len(cards), 1)
+        self.assertContains(response, "Исправленный текст")
+
+    def test_group_change_rerenders_its_cards(self):
+        """Переименование группы перерисовывает карточки её постов"""
+        self.rendered_cards(reverse("posts:index"))
+        self.group.title = "Новое название"
+        self.group.save()
+        self.assertEqual(len(self.rendered_cards(reverse("posts:index"))), 3)
+
+    def test_author_rename_rerenders_cards(self):
+        """Новое имя автора перерисовывает карточки его постов"""
+        self.rendered_cards(reverse("posts:index"))
+        self.user.first_name = "Егор"
+        self.user.save()
+        # Сама страница ленты живёт в кеше своё время, сбрасываем её.
+        caching.bump("index")
+        response = self.client.get(reverse("posts:index"))
+        cards = [
+            template for template in response.templates
+            if template.name == CARD_TEMPLATE
+        ]
+        self.assertEqual(len(cards), 3)
+        self.assertContains(response, "Егор")
@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..urls import urlpatterns
+
+User = get_user_model()
+
+# Максимальное число запросов к БД для каждого view из posts/urls.py.
+# Два запроса из бюджета HTML-страниц уходят на сессию и пользователя;
+# ленты RSS/Atom сессию не читают.
+QUERY_BUDGETS = {
+    "index": 3,
+    "index_rss": 1,
+    "index_atom": 1,
+    "group_posts": 4,
+    "group_rss": 2,
+    "group_atom": 2,
+    "profile": 5,
+    "profile_rss": 2,
+    "profile_atom": 2,
+    "post_detail": 5,
+    "post_comments": 1,
+    "search": 3,
+    "post_create": 3,
+    "post_edit": 4,
+    "add_comment": 3,
+    "follow_index": 3,
+    "profile_follow": 11,
+    "profile_unfollow": 10,
+}
+# Параметры GET для view, которым без них нечего делать.
+QUERY_PARAMS = {
+    "search": {"q": "пост"},
+}
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="writer")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text="Тестовый пост", group=cls.group
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def grow(self, count):
+        """Добавляет посты, комментарии и подписки."""
+        for i in range(count):
+            user = User.objects.create_user(
+                username=f"user{User.objects.count()}"
+            )
+            group = Group.objects.create(
+                title=f"Группа {i}", slug=f"group-{user.pk}", description="-"
+            )
+            Post.objects.create(author=self.user, text="пост", group=group)
+            Post.objects.create(author=self.author, text="пост", group=group)
+            Post.objects.create(author=user, text="пост", group=self.group)
+            Comment.objects.create(post=self.post, author=user, text="-")
+            Follow.objects.create(user=user, author=self.user)
+            Follow.objects.create(user=self.user, author=user)
+
+    def urls(self):
+        kwargs = {
+            "slug": self.group.slug,
+            "username": self.author.username,
+            "post_id": self.post.pk,
+        }
+        for pattern in urlpatterns:
+            if pattern.name not in QUERY_BUDGETS:
+                continue
+            params = {
+                name: kwargs[name] for name in pattern.pattern.converters
+            }
+            yield pattern.name, reverse(f"posts:{pattern.name}",
+                                        kwargs=params)
+
+    def count_queries(self):
+        Follow.objects.filter(user=self.user, author=self.author).delete()
+        counts = {}
+        for name, url in self.urls():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, QUERY_PARAMS.get(name, {}))
+            counts[name] = len(queries)
+        return counts
+
+    def test_every_view_has_budget(self):
+        """У каждого view приложения posts есть бюджет запросов"""
+        names = {pattern.name for pattern in urlpatterns if pattern.name}
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_views_fit_query_budget(self):
+        """Число запросов не превышает бюджет и не растёт с данными"""
+        # Малый набор меньше страницы пагинатора, а большой заполняет
+        # её целиком: лишний запрос на каждый пост изменит счёт.
+        self.grow(1)
+        small = self.count_queries()
+        self.grow(15)
+        large = self.count_queries()
+        for name, budget in QUERY_BUDGETS.items():
+            with self.subTest(view=name):
+                self.assertLessEqual(large[name], budget)
+                self.assertEqual(small[name], large[name])
@@ -0,0 +1,95 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..paginators import encode_cursor
+
+User = get_user_model()
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?posts_\w+$')
+TEMP_SORT = 'USE TEMP B-TREE'
+
+
+def explain(sql):
+    """Возвращает строки EXPLAIN QUERY PLAN для выполненного запроса."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@skipUnless(connection.vendor == 'sqlite', 'План запроса в формате SQLite')
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="writer")
+        cls.group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        for i in range(12):
+            post = Post.objects.create(
+                author=cls.author, text=f"пост {i}", group=cls.group
+            )
+            Comment.objects.create(post=post, author=cls.user, text="ок")
+        cls.post = post
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def feed_urls(self):
+        urls = [
+            reverse("posts:index"),
+            reverse("posts:group_posts", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+            reverse("posts:follow_index"),
+        ]
+        for url in urls:
+            yield url, {}
+            yield url, {"page": "2"}
+            yield url, {"page": "last"}
+            cache.clear()
+            page = self.client.get(url).context["page_obj"]
+            yield url, {"after": page.next_cursor}
+            # У первой страницы нет предыдущей, курсор назад берётся
+            # со второй.
+            cache.clear()
+            later = self.client.get(
+                url, {"after": page.next_cursor}
+            ).context["page_obj"]
+            self.assertTrue(later.previous_cursor)
+            yield url, {"before": later.previous_cursor}
+        yield reverse("posts:post_detail", args=[self.post.pk]), {}
+        comment = Comment.objects.first()
+        yield reverse("posts:post_comments", args=[self.post.pk]), {
+            "after": encode_cursor(comment.created, comment.pk)
+        }
+
+    def test_views_use_indexes(self):
+        """Запросы view используют индексы без временной сортировки"""
+        for url, params in self.feed_urls():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url, params)
+            for query in queries.captured_queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT") or "posts_" not in sql:
+                    continue
+                with self.subTest(url=url, params=params, sql=sql):
+                    plan = explain(sql)
+                    self.assertFalse(
+                        [line for line in plan
+                         if FULL_SCAN.match(line) or TEMP_SORT in line],
+                        plan,
+                    )
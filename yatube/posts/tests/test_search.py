@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post
+from ..views import PAGINATOR_COUNT
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="egor", is_staff=True,
+                                            is_superuser=True)
+        cls.best = Post.objects.create(
+            author=cls.user, text="Ёжик ёжик в тумане"
+        )
+        cls.other = Post.objects.create(
+            author=cls.user,
+            text="Про ёжика одна строчка среди длинного рассказа о лесе, "
+                 "реке, тумане, лошади и сове",
+        )
+        Post.objects.create(author=cls.user, text="Совсем про другое")
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def found(self, query, **params):
+        response = self.client.get(
+            reverse("posts:search"), {"q": query, **params}
+        )
+        return response.context["page_obj"]
+
+    def found_ids(self, query):
+        return [post.pk for post in self.found(query)]
+
+    def test_results_are_ranked(self):
+        """Лучшее совпадение идёт первым, префиксы находятся"""
+        self.assertEqual(self.found_ids("ёжик"),
+                         [self.best.pk, self.other.pk])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Правка и удаление поста сразу видны в поиске"""
+        other = Post.objects.get(pk=self.other.pk)
+        other.text = "Про лису"
+        other.save()
+        self.assertEqual(self.found_ids("ёжик"), [self.best.pk])
+        self.assertEqual(self.found_ids("лиса"), [])
+        self.assertEqual(self.found_ids("лису"), [other.pk])
+        Post.objects.filter(pk=self.best.pk).delete()
+        self.assertEqual(self.found_ids("ёжик"), [])
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 во вводе не ломают поиск"""
+        for query in ('"', "ёжик AND", "NEAR(", "*", "ёжик OR -"):
+            with self.subTest(query=query):
+                response = self.client.get(
+                    reverse("posts:search"), {"q": query}
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_empty_query_shows_only_form(self):
+        """Без запроса страница поиска не ищет"""
+        self.assertIsNone(self.found(""))
+
+    def test_cursor_pagination_keeps_query(self):
+        """Курсор проходит все результаты, ссылки сохраняют запрос"""
+        Post.objects.bulk_create(
+            Post(author=self.user, text=f"туман {i}") for i in range(15)
+        )
+        expected = set(
+            Post.objects.filter(text__icontains="туман")
+            .values_list("pk", flat=True)
+        )
+        page = self.found("туман")
+        self.assertEqual(len(page), PAGINATOR_COUNT)
+        response = self.client.get(reverse("posts:search"), {"q": "туман"})
+        self.assertContains(response, f"?q=%D1%82%D1%83%D0%BC%D0%B0%D0%BD"
+                                      f"&amp;after={page.next_cursor}")
+        seen = [post.pk for post in page]
+        while page.has_next():
+            page = self.found("туман", after=page.next_cursor)
+            seen.extend(post.pk for post in page)
+        self.assertEqual(len(seen), len(expected))
+        self.assertEqual(set(seen), expected)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через индекс, а не LIKE"""
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse("admin:posts_post_changelist"), {"q": "ёжик"}
+            )
+        self.assertEqual(response.context["cl"].result_count, 2)
+        sql = " ".join(query["sql"] for query in queries.captured_queries)
+        self.assertIn("MATCH", sql)
+        self.assertNotIn("LIKE", sql)
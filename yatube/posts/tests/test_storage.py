@@ -0,0 +1,94 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ContentHashStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="egor")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(os.path.join(TEMP_MEDIA_ROOT, "posts"),
+                      ignore_errors=True)
+        os.makedirs(os.path.join(TEMP_MEDIA_ROOT, "posts"))
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def stored_files(self):
+        return os.listdir(os.path.join(TEMP_MEDIA_ROOT, "posts"))
+
+    def test_identical_uploads_share_file(self):
+        """Одинаковые загрузки хранятся одним файлом"""
+        for name in ("first.gif", "second.GIF"):
+            self.client.post(reverse("posts:post_create"), {
+                "text": name,
+                "image": SimpleUploadedFile(
+                    name=name, content=SMALL_GIF, content_type="image/gif"
+                ),
+            })
+        first, second = Post.objects.order_by("pk")
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertEqual(len(self.stored_files()), 1)
+
+    def test_repeated_upload_refreshes_file_date(self):
+        """Повторная загрузка обновляет дату файла для gc_media"""
+        storage = Post._meta.get_field("image").storage
+        name = storage.save("posts/first.gif", ContentFile(SMALL_GIF))
+        os.utime(storage.path(name), (0, 0))
+        self.assertEqual(
+            storage.save("posts/second.gif", ContentFile(SMALL_GIF)), name
+        )
+        self.assertGreater(os.path.getmtime(storage.path(name)), 0)
+
+    def test_dedupe_media_rewrites_paths(self):
+        """Команда склеивает старые копии и переписывает пути постов"""
+        storage = Post._meta.get_field("image").storage
+        for i in range(3):
+            name = f"posts/image_{i}.gif"
+            with open(storage.path(name), "wb") as file:
+                file.write(SMALL_GIF)
+            Post.objects.create(author=self.user, text=str(i), image=name)
+        dry = StringIO()
+        call_command("dedupe_media", dry_run=True, stdout=dry)
+        self.assertIn("Будет переименовано файлов: 3 → 1", dry.getvalue())
+        self.assertEqual(len(self.stored_files()), 3)
+        out = StringIO()
+        call_command("dedupe_media", stdout=out)
+        self.assertIn(f"освобождено байт: {2 * len(SMALL_GIF)}",
+                      out.getvalue())
+        names = set(Post.objects.values_list("image", flat=True))
+        self.assertEqual(len(names), 1)
+        name = names.pop()
+        self.assertEqual(self.stored_files(), [os.path.basename(name)])
+        with storage.open(name) as file:
+            self.assertEqual(file.read(), SMALL_GIF)
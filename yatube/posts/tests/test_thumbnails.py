@@ -0,0 +1,159 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from itertools import count
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Post
+from ..templatetags.post_cards import PENDING_CARD_TIMEOUT
+from ..thumbnails import FEED_GEOMETRIES, THUMBNAIL_GEOMETRIES, generate
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+def run_on_commit(func):
+    # TestCase не фиксирует транзакцию, поэтому колбэк вызывается сразу.
+    func()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_ASYNC=False)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="egor")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(os.path.join(TEMP_MEDIA_ROOT, "cache"),
+                      ignore_errors=True)
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def thumbnail_files(self):
+        found = []
+        for root, _, files in os.walk(os.path.join(TEMP_MEDIA_ROOT, "cache")):
+            found.extend(os.path.join(root, name) for name in files)
+        return found
+
+    def upload(self):
+        return SimpleUploadedFile(
+            name="small.gif", content=SMALL_GIF, content_type="image/gif"
+        )
+
+    @mock.patch("posts.thumbnails.transaction.on_commit", run_on_commit)
+    def test_create_generates_thumbnails(self):
+        """Сохранение поста с картинкой создаёт все миниатюры"""
+        self.client.post(
+            reverse("posts:post_create"),
+            {"text": "С картинкой", "image": self.upload()},
+        )
+        self.assertEqual(
+            len(self.thumbnail_files()), len(THUMBNAIL_GEOMETRIES)
+        )
+        post = Post.objects.get(text="С картинкой")
+        self.client.get(reverse("posts:post_detail", args=[post.pk]))
+        self.assertEqual(
+            len(self.thumbnail_files()), len(THUMBNAIL_GEOMETRIES)
+        )
+
+    @mock.patch("posts.thumbnails.transaction.on_commit", run_on_commit)
+    def test_edit_without_new_image_skips_generation(self):
+        """Правка без новой картинки не запускает генерацию"""
+        post = Post.objects.create(
+            author=self.user, text="С картинкой", image=self.upload()
+        )
+        with mock.patch("posts.thumbnails.generate") as generate:
+            self.client.post(
+                reverse("posts:post_edit", args=[post.pk]),
+                {"text": "Новый текст"},
+            )
+        generate.assert_not_called()
+
+    def test_command_generates_missing_thumbnails(self):
+        """Команда создаёт миниатюры для уже загруженных картинок"""
+        Post.objects.create(
+            author=self.user, text="Старый", image=self.upload()
+        )
+        out = StringIO()
+        call_command("generate_thumbnails", workers=1, stdout=out)
+        self.assertIn("Обработано картинок: 1, с ошибками: 0", out.getvalue())
+        self.assertEqual(
+            len(self.thumbnail_files()), len(THUMBNAIL_GEOMETRIES)
+        )
+
+    def test_feed_serves_srcset_instead_of_original(self):
+        """Лента отдаёт миниатюры со srcset и ленивой загрузкой"""
+        post = Post.objects.create(
+            author=self.user, text="С картинкой", image=self.upload()
+        )
+        generate(post.image)
+        response = self.client.get(reverse("posts:index"))
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, "srcset=")
+        self.assertNotContains(response, f'src="{post.image.url}"')
+        for geometry in FEED_GEOMETRIES:
+            width = geometry.split("x")[0]
+            with self.subTest(geometry=geometry):
+                self.assertContains(response, f" {width}w")
+
+    def test_feed_does_not_generate_thumbnails(self):
+        """Лента без готовых миниатюр отдаёт оригинал и не создаёт их"""
+        post = Post.objects.create(
+            author=self.user, text="С картинкой", image=self.upload()
+        )
+        with mock.patch("sorl.thumbnail.base.ThumbnailBackend"
+                        "._create_thumbnail") as create, \
+                mock.patch("posts.templatetags.post_cards.cache.set_many",
+                           wraps=cache.set_many) as set_many:
+            response = self.client.get(reverse("posts:index"))
+        create.assert_not_called()
+        self.assertEqual(self.thumbnail_files(), [])
+        self.assertContains(response, f'src="{post.image.url}"')
+        self.assertNotContains(response, "srcset=")
+        # Карточка с оригиналом кешируется ненадолго.
+        set_many.assert_called_once_with(mock.ANY, PENDING_CARD_TIMEOUT)
+
+    @mock.patch(
+        "posts.management.commands.generate_thumbnails.CHUNK_PER_WORKER", 1
+    )
+    def test_command_counts_results_across_chunks(self):
+        """Пул потоков обрабатывает картинки пачками и считает ошибки"""
+        for i in range(5):
+            Post.objects.create(
+                author=self.user, text=str(i), image=self.upload()
+            )
+        calls = count(1)
+
+        def generate(image):
+            # Третья по счёту картинка завершается ошибкой.
+            return next(calls) != 3
+
+        out = StringIO()
+        with mock.patch("posts.thumbnails.generate_in_thread", generate):
+            call_command("generate_thumbnails", workers=2, stdout=out)
+        self.assertEqual(next(calls), 6)
+        self.assertIn("Обработано картинок: 4, с ошибками: 1", out.getvalue())
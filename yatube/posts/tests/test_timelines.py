@@ -0,0 +1,89 @@
+from importlib import import_module
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from .. import timelines
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="writer")
+        cls.other = User.objects.create_user(username="other")
+        cls.old_post = Post.objects.create(author=cls.author, text="старый")
+        Post.objects.create(author=cls.other, text="чужой")
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def timeline(self):
+        return set(
+            TimelineEntry.objects.filter(user=self.reader)
+            .values_list("post_id", flat=True)
+        )
+
+    def test_follow_adds_existing_posts(self):
+        """Подписка добавляет в ленту уже опубликованные посты автора"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline(), {self.old_post.pk})
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text="новый")
+        self.assertEqual(self.timeline(), {self.old_post.pk, post.pk})
+        response = self.client.get(reverse("posts:follow_index"))
+        self.assertEqual(response.context["page_obj"][0], post)
+
+    def test_unfollow_removes_posts(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.client.get(
+            reverse("posts:profile_unfollow", args=[self.author])
+        )
+        self.assertEqual(self.timeline(), set())
+
+    def test_check_and_backfill_commands(self):
+        """Проверка находит расхождения, а --fix и backfill их чинят"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command("check_timelines", stdout=StringIO())
+        call_command("check_timelines", fix=True, stdout=StringIO())
+        self.assertEqual(self.timeline(), {self.old_post.pk})
+
+        TimelineEntry.objects.all().delete()
+        call_command("backfill_timelines", stdout=StringIO())
+        self.assertEqual(self.timeline(), {self.old_post.pk})
+        call_command("check_timelines", stdout=StringIO())
+
+    def test_failed_rebuild_keeps_old_timeline(self):
+        """Упавшая пересборка оставляет ленту прежней"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timelines, "add_author",
+                               side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                timelines.rebuild(self.reader.pk)
+        self.assertEqual(self.timeline(), {self.old_post.pk})
+
+    def test_migration_backfills_existing_follows(self):
+        """Миграция заполняет ленты для уже существующих подписок"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        TimelineEntry.objects.all().delete()
+        migration = import_module("posts.migrations.0014_backfill_timelines")
+        migration.fill_timelines(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(self.timeline(), {self.old_post.pk})
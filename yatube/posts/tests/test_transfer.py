@@ -0,0 +1,99 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="writer")
+        group = Group.objects.create(
+            title="Тестовая группа",
+            slug="test-slug",
+            description="Тестовое описание",
+        )
+        for i in range(5):
+            post = Post.objects.create(
+                author=cls.author, text=f"Пост {i}", group=group,
+                image="posts/image.gif" if i else "",
+            )
+            Comment.objects.create(
+                post=post, author=cls.reader, text=f"Ответ {i}"
+            )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def snapshot(self):
+        return (
+            list(Post.objects.order_by("pk").values_list(
+                "pk", "author__username", "group__slug", "text", "image",
+                "pub_date", "updated", "comments_count",
+            )),
+            list(Comment.objects.order_by("pk").values_list(
+                "pk", "post_id", "author__username", "text", "created",
+            )),
+            list(Follow.objects.values_list(
+                "user__username", "author__username"
+            )),
+            list(TimelineEntry.objects.order_by("post_id").values_list(
+                "user__username", "post_id"
+            )),
+            User.objects.get(username="writer").stats.posts_count,
+        )
+
+    def test_round_trip(self):
+        """Выгрузка и загрузка восстанавливают данные, даты и счётчики"""
+        before = self.snapshot()
+        call_command("export_posts", output=self.path, chunk_size=2,
+                     stderr=StringIO())
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        out = StringIO()
+        call_command("import_posts", self.path, batch_size=2, stdout=out)
+        self.assertEqual(self.snapshot(), before)
+        self.assertIn("строк/с", out.getvalue())
+
+    def test_import_is_idempotent(self):
+        """Повторная загрузка не создаёт дубликатов"""
+        call_command("export_posts", output=self.path, stderr=StringIO())
+        before = self.snapshot()
+        call_command("import_posts", self.path, stdout=StringIO())
+        self.assertEqual(self.snapshot(), before)
+
+    def test_import_does_not_overwrite_colliding_ids(self):
+        """Занятый id не затирает чужой пост, комментарии идут к новому"""
+        call_command("export_posts", output=self.path, stderr=StringIO())
+        source = Post.objects.get(text="Пост 0")
+        Comment.objects.all().delete()
+        Post.objects.all().delete()
+        other = Post.objects.create(
+            pk=source.pk, author=self.reader, text="Чужой пост"
+        )
+        dates = (other.pub_date, other.updated)
+        call_command("import_posts", self.path, stdout=StringIO())
+        other.refresh_from_db()
+        self.assertEqual((other.pub_date, other.updated), dates)
+        self.assertEqual(other.text, "Чужой пост")
+        self.assertFalse(other.comments.exists())
+        imported = Post.objects.get(text="Пост 0")
+        self.assertNotEqual(imported.pk, source.pk)
+        self.assertEqual(imported.pub_date, source.pub_date)
+        self.assertEqual(
+            list(imported.comments.values_list("text", flat=True)),
+            ["Ответ 0"],
+        )
+        self.assertEqual(Post.objects.filter(author=self.author).count(), 5)
@@ -9,13 +9,13 @@ from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 
-from ..models import Post, Group, Follow
+from ..models import Comment, Post, Group, Follow
 
 User = get_user_model()
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_ASYNC=False)
 class PostPagesTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -65,6 +65,7 @@ class PostPagesTests(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -244,18 +245,71 @@ class PostPagesTests(TestCase):
 
     def test_cache(self):
         """Тест кеша"""
-        response = self.authorized_client.get(reverse("posts:index"))
+        response = self.guest_client.get(reverse("posts:index"))
         posts_old_content = response.content
-        post_last = Post.objects.last()
-        post_last.delete()
-        new_response = self.authorized_client.get(reverse("posts:index"))
+        # update() не шлёт сигналов, поэтому страница остаётся в кеше.
+        Post.objects.filter(pk=self.post.pk).update(text="Без сигнала")
+        new_response = self.guest_client.get(reverse("posts:index"))
         post_new_content = new_response.content
         cache.clear()
-        new_response1 = self.authorized_client.get(reverse("posts:index"))
+        new_response1 = self.guest_client.get(reverse("posts:index"))
         post_new_content1 = new_response1.content
         self.assertEqual(posts_old_content, post_new_content)
         self.assertNotEqual(post_new_content, post_new_content1)
 
+    def test_cache_invalidated_by_changes(self):
+        """Изменения постов, комментариев и групп сбрасывают кеш страниц"""
+        detail_url = reverse("posts:post_detail", args=[self.post.pk])
+        pages = {
+            reverse("posts:index"): lambda: Post.objects.create(
+                author=self.user, text="Новый пост"),
+            reverse("posts:group_posts", args=[self.group.slug]):
+                lambda: Post.objects.get(pk=self.post.pk).save(),
+            reverse("posts:profile", args=[self.user]):
+                lambda: Post.objects.first().delete(),
+            detail_url: lambda: Comment.objects.create(
+                post=self.post, author=self.user, text="Комментарий"),
+        }
+        for url, change in pages.items():
+            with self.subTest(url=url):
+                self.guest_client.get(url)
+                cached = self.guest_client.get(url)
+                self.assertIsNone(cached.context)
+                change()
+                fresh = self.guest_client.get(url)
+                self.assertIsNotNone(fresh.context)
+        self.guest_client.get(detail_url)
+        self.group.save()
+        self.assertIsNotNone(self.guest_client.get(detail_url).context)
+
+    def test_cached_pages_are_not_shared_between_users(self):
+        """Страница одного пользователя не достаётся другим из кеша"""
+        other = User.objects.create_user(username="other")
+        other_client = Client()
+        other_client.force_login(other)
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:profile", args=[self.user]),
+            reverse("posts:post_detail", args=[self.post.pk]),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                cache.clear()
+                own = self.authorized_client.get(url)
+                token = own.context["csrf_token"]
+                for client in (other_client, self.guest_client):
+                    response = client.get(url)
+                    self.assertNotContains(
+                        response, f"Пользователь: {self.user.username}"
+                    )
+                    self.assertNotContains(response, str(token))
+        cache.clear()
+        other_client.get(reverse("posts:post_detail", args=[self.post.pk]))
+        response = self.authorized_client.get(
+            reverse("posts:post_detail", args=[self.post.pk])
+        )
+        self.assertContains(response, "Редактировать")
+
     def test_404_template(self):
         """Проверяем что исрользуется кастомный шаблон 404"""
         response = self.authorized_client.get("http://127.0.0.1:8000/404")
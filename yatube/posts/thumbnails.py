@@ -0,0 +1,95 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+logger = logging.getLogger(__name__)
+
+# Размеры и опции совпадают с тегами {% thumbnail %} в шаблонах,
+# иначе sorl посчитает другой ключ и сделает миниатюру заново.
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+# Варианты картинки в карточке ленты для srcset, от узкого к широкому.
+FEED_GEOMETRIES = ('430x170', '860x339', '1290x509')
+FEED_DEFAULT = '860x339'
+DETAIL_GEOMETRY = '960x339'
+THUMBNAIL_GEOMETRIES = tuple(
+    (geometry, THUMBNAIL_OPTIONS)
+    for geometry in (*FEED_GEOMETRIES, DETAIL_GEOMETRY)
+)
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def cached_thumbnail(image, geometry, options=THUMBNAIL_OPTIONS):
+    """Готовая миниатюра из KV-хранилища sorl или None.
+
+    Имя миниатюры считается так же, как в ThumbnailBackend.get_thumbnail,
+    но ни файлы, ни генерация не трогаются.
+    """
+    backend = default.backend
+    source = ImageFile(image)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry, options)
+    return default.kvstore.get(ImageFile(name, default.storage))
+
+
+def generate(image):
+    """Создаёт все миниатюры картинки; уже готовые sorl пропускает."""
+    for geometry, options in THUMBNAIL_GEOMETRIES:
+        get_thumbnail(image, geometry, **options)
+
+
+def generate_safely(image):
+    """Как generate, но пишет ошибку в лог и возвращает False."""
+    try:
+        generate(image)
+        return True
+    except Exception:
+        logger.exception('Не удалось создать миниатюры для %s', image.name)
+        return False
+
+
+def generate_in_thread(image):
+    """generate_safely для потока пула."""
+    try:
+        return generate_safely(image)
+    finally:
+        # Поток пула держит собственное соединение с базой (KV-хранилище
+        # sorl), его нужно закрыть, чтобы не копить открытые соединения.
+        connections.close_all()
+
+
+def schedule(post):
+    """Ставит генерацию миниатюр поста в очередь после коммита."""
+    if not post.image:
+        return
+    image = post.image
+    if settings.POSTS_THUMBNAIL_ASYNC:
+        transaction.on_commit(
+            lambda: _get_executor().submit(generate_in_thread, image)
+        )
+    else:
+        transaction.on_commit(lambda: generate_safely(image))
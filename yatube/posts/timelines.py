@@ -0,0 +1,94 @@
+from django.db import transaction
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def _insert(entries):
+    """Вставляет записи ленты пачками, пропуская уже существующие."""
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    followers = (
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=post.pk,
+                      author_id=post.author_id, pub_date=post.pub_date)
+        for user_id in followers
+    )
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту пользователя посты автора."""
+    posts = (
+        Post.objects.filter(author_id=author_id)
+        .values_list('pk', 'pub_date')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=post_id,
+                      author_id=author_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    )
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты пользователя посты автора."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user_id):
+    """Пересобирает ленту пользователя по его подпискам.
+
+    Удаление и вставка идут одной транзакцией: пока лента собирается,
+    читатели видят старую, а не пустую или наполовину заполненную.
+    """
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        authors = Follow.objects.filter(user_id=user_id).values_list(
+            'author_id', flat=True
+        )
+        for author_id in authors:
+            add_author(user_id, author_id)
+
+
+def missing_posts(user_id):
+    """Посты подписок, которых нет в ленте пользователя."""
+    return Post.objects.filter(author__following__user_id=user_id).exclude(
+        timeline_entries__user_id=user_id
+    )
+
+
+def extra_entries(user_id):
+    """Записи ленты, для которых у пользователя нет подписки."""
+    return TimelineEntry.objects.filter(user_id=user_id).exclude(
+        author__following__user_id=user_id
+    )
+
+
+def repair(user_id):
+    """Досоздаёт недостающие и удаляет лишние записи ленты."""
+    extra_entries(user_id).delete()
+    # Выборка читает ту же таблицу, в которую идёт вставка, поэтому
+    # недостающие посты забираются целиком до начала записи.
+    missing = list(
+        missing_posts(user_id).values_list('pk', 'author_id', 'pub_date')
+    )
+    _insert(
+        TimelineEntry(user_id=user_id, post_id=post_id,
+                      author_id=author_id, pub_date=pub_date)
+        for post_id, author_id, pub_date in missing
+    )
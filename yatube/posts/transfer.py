@@ -0,0 +1,272 @@
+from django.contrib.auth.hashers import make_password
+from django.db import connections, router
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from .models import Comment, Follow, Group, Post, User
+
+# Временная таблица соответствия исходных id постов новым.
+POST_IDS_TABLE = 'posts_import_post_ids'
+
+# Порядок важен: строки ссылаются только на уже выгруженные записи.
+EXPORTS = (
+    ('user', User, {
+        'username': 'username',
+        'first_name': 'first_name',
+        'last_name': 'last_name',
+        'email': 'email',
+    }),
+    ('group', Group, {
+        'slug': 'slug',
+        'title': 'title',
+        'description': 'description',
+    }),
+    ('post', Post, {
+        'id': 'id',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'image': 'image',
+        'pub_date': 'pub_date',
+        'updated': 'updated',
+    }),
+    ('comment', Comment, {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+    ('follow', Follow, {
+        'user': 'user__username',
+        'author': 'author__username',
+    }),
+)
+
+
+def export_rows(chunk_size):
+    """Отдаёт записи для выгрузки по одной, читая базу пачками."""
+    for kind, model, fields in EXPORTS:
+        rows = (
+            model.objects.order_by('pk').values_list(*fields.values())
+            .iterator(chunk_size=chunk_size)
+        )
+        for row in rows:
+            record = dict(zip(fields, row))
+            record['type'] = kind
+            yield record
+
+
+def _user_ids(*names):
+    return dict(
+        User.objects.filter(username__in=set(names))
+        .values_list('username', 'pk')
+    )
+
+
+def _dates(batch, field):
+    return [parse_datetime(record[field]) for record in batch]
+
+
+def _restore_dates(model, objects, fields):
+    """Возвращает даты из выгрузки, которые затёр auto_now(_add).
+
+    bulk_create вызывает pre_save полей, и auto_now_add/auto_now
+    подставляют текущее время; bulk_update их не трогает.
+    """
+    for obj, values in zip(objects, zip(*fields.values())):
+        for field, value in zip(fields, values):
+            setattr(obj, field, value)
+    model.objects.bulk_update(objects, list(fields))
+
+
+def import_users(batch, state):
+    users = [
+        User(
+            username=record['username'],
+            first_name=record['first_name'],
+            last_name=record['last_name'],
+            email=record['email'],
+            # Пароли не переносятся, войти можно после сброса пароля.
+            password=make_password(None),
+        )
+        for record in batch
+    ]
+    User.objects.bulk_create(users, ignore_conflicts=True)
+    return len(users)
+
+
+def import_groups(batch, state):
+    groups = [Group(**{
+        field: record[field] for field in ('slug', 'title', 'description')
+    }) for record in batch]
+    Group.objects.bulk_create(groups, ignore_conflicts=True)
+    return len(groups)
+
+
+def _free_pks(model, ids):
+    """Первичные ключи для новых строк: исходный id, если он свободен.
+
+    Занятый id в базе принадлежит другой записи, поэтому строка
+    получает новый ключ после наибольшего занятого и исходного.
+    """
+    taken = set(
+        model.objects.filter(pk__in=ids).values_list('pk', flat=True)
+    )
+    largest = model.objects.aggregate(largest=Max('pk'))['largest'] or 0
+    next_pk = max([largest, *ids]) + 1
+    pks = []
+    for source_id in ids:
+        if source_id in taken:
+            source_id, next_pk = next_pk, next_pk + 1
+        pks.append(source_id)
+    return pks
+
+
+def _post_ids_cursor():
+    return connections[router.db_for_write(Post)].cursor()
+
+
+def _remember_post_ids(state, pairs):
+    """Сохраняет пары (исходный id, новый id) во временную таблицу.
+
+    Соответствие для миллионов постов не держится в памяти: таблица
+    живёт до конца соединения, а state только отмечает, что она создана.
+    """
+    with _post_ids_cursor() as cursor:
+        if not state.get('post_ids'):
+            # Таблица могла остаться от прошлой загрузки в этом соединении.
+            cursor.execute(f'DROP TABLE IF EXISTS {POST_IDS_TABLE}')
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {POST_IDS_TABLE} '
+                f'(source_id bigint PRIMARY KEY, post_id bigint NOT NULL)'
+            )
+            state['post_ids'] = True
+        cursor.executemany(
+            f'INSERT INTO {POST_IDS_TABLE} (source_id, post_id) '
+            f'VALUES (%s, %s)',
+            pairs,
+        )
+
+
+def _post_ids(state, source_ids):
+    """Новые id постов для исходных id одной пачки."""
+    source_ids = list(set(source_ids))
+    if not state.get('post_ids') or not source_ids:
+        return {}
+    placeholders = ', '.join(['%s'] * len(source_ids))
+    with _post_ids_cursor() as cursor:
+        cursor.execute(
+            f'SELECT source_id, post_id FROM {POST_IDS_TABLE} '
+            f'WHERE source_id IN ({placeholders})',
+            source_ids,
+        )
+        return dict(cursor.fetchall())
+
+
+def import_posts(batch, state):
+    """Загружает посты и запоминает соответствие их id во временной таблице.
+
+    Пост, уже загруженный раньше, узнаётся по автору, дате и тексту;
+    комментарии из следующих пачек привязываются через это соответствие.
+    """
+    authors = _user_ids(*(record['author'] for record in batch))
+    groups = dict(
+        Group.objects.filter(
+            slug__in={record['group'] for record in batch}
+        ).values_list('slug', 'pk')
+    )
+    batch = [record for record in batch if record['author'] in authors]
+    pub_dates = _dates(batch, 'pub_date')
+    existing = {
+        (author_id, pub_date, text): pk
+        for author_id, pub_date, text, pk in Post.objects.filter(
+            author_id__in=authors.values(), pub_date__in=pub_dates
+        ).values_list('author_id', 'pub_date', 'text', 'pk')
+    }
+    pairs, new = [], []
+    for record, pub_date in zip(batch, pub_dates):
+        key = (authors[record['author']], pub_date, record['text'])
+        if key in existing:
+            pairs.append((record['id'], existing[key]))
+        else:
+            new.append(record)
+    pks = _free_pks(Post, [record['id'] for record in new])
+    posts = [
+        Post(
+            pk=pk,
+            author_id=authors[record['author']],
+            group_id=groups.get(record['group']),
+            text=record['text'],
+            image=record['image'],
+        )
+        for record, pk in zip(new, pks)
+    ]
+    Post.objects.bulk_create(posts)
+    _restore_dates(Post, posts, {
+        'pub_date': _dates(new, 'pub_date'),
+        'updated': _dates(new, 'updated'),
+    })
+    pairs.extend((record['id'], pk) for record, pk in zip(new, pks))
+    _remember_post_ids(state, pairs)
+    return len(posts)
+
+
+def import_comments(batch, state):
+    post_ids = _post_ids(state, (record['post'] for record in batch))
+    authors = _user_ids(*(record['author'] for record in batch))
+    batch = [
+        record for record in batch
+        if record['author'] in authors and record['post'] in post_ids
+    ]
+    created = _dates(batch, 'created')
+    existing = set(
+        Comment.objects.filter(
+            post_id__in={post_ids[record['post']] for record in batch},
+            created__in=created,
+        ).values_list('post_id', 'author_id', 'created', 'text')
+    )
+    new = [
+        (record, date) for record, date in zip(batch, created)
+        if (post_ids[record['post']], authors[record['author']], date,
+            record['text']) not in existing
+    ]
+    pks = _free_pks(Comment, [record['id'] for record, _ in new])
+    comments = [
+        Comment(
+            pk=pk,
+            post_id=post_ids[record['post']],
+            author_id=authors[record['author']],
+            text=record['text'],
+        )
+        for (record, _), pk in zip(new, pks)
+    ]
+    Comment.objects.bulk_create(comments)
+    _restore_dates(Comment, comments, {
+        'created': [date for _, date in new],
+    })
+    return len(comments)
+
+
+def import_follows(batch, state):
+    users = _user_ids(*(
+        name for record in batch for name in (record['user'],
+                                              record['author'])
+    ))
+    follows = [
+        Follow(user_id=users[record['user']],
+               author_id=users[record['author']])
+        for record in batch
+        if record['user'] in users and record['author'] in users
+    ]
+    Follow.objects.bulk_create(follows, ignore_conflicts=True)
+    return len(follows)
+
+
+IMPORTERS = {
+    'user': import_users,
+    'group': import_groups,
+    'post': import_posts,
+    'comment': import_comments,
+    'follow': import_follows,
+}
@@ -6,11 +6,23 @@ from django.conf.urls.static import static
 app_name = 'posts'
 urlpatterns = [
     path('', views.index, name='index'),
+    path('rss/', views.index_rss, name='index_rss'),
+    path('atom/', views.index_atom, name='index_atom'),
     path('group/<slug:slug>/', views.group_posts, name='group_posts'),
+    path('group/<slug:slug>/rss/', views.group_rss, name='group_rss'),
+    path('group/<slug:slug>/atom/', views.group_atom, name='group_atom'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/rss/', views.profile_rss,
+         name='profile_rss'),
+    path('profile/<str:username>/atom/', views.profile_atom,
+         name='profile_atom'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='post_comments'),
     path('posts/<int:post_id>/comment/',
          views.add_comment,
          name='add_comment'),
@@ -1,32 +1,61 @@
+from django.core.paginator import InvalidPage
+from django.http import Http404
 from django.shortcuts import render, get_object_or_404, redirect
+from django.utils.http import urlencode
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-from django.core.paginator import Paginator
-from .models import Post, Group, User, Follow
+from .caching import cache_page_versioned, condition_versioned
+from .models import Comment, Post, Group, User, Follow, TimelineEntry
 from .forms import PostForm, CommentForm
+from .paginators import CursorPaginator
+from . import feeds, search as post_search, thumbnails
 
 PAGINATOR_COUNT = 10
+COMMENTS_COUNT = 20
+CACHE_TIMEOUT = 60 * 60
+INDEX_SCOPES = ("index", "groups")
+GROUP_SCOPES = ("group:{slug}", "groups")
+PROFILE_SCOPES = ("profile:{username}", "groups")
+
+
+def cursor_page(paginator, params):
+    """Страница по курсору; на испорченный курсор отвечаем 404."""
+    try:
+        return paginator.cursor_page(params)
+    except InvalidPage:
+        raise Http404("Неверный курсор")
 
 
 def paginator_func(post_list, request):
-    paginator = Paginator(post_list, PAGINATOR_COUNT)
-    page_number = request.GET.get("page")
-    return paginator.get_page(page_number)
+    paginator = CursorPaginator(post_list, PAGINATOR_COUNT)
+    return cursor_page(paginator, request.GET)
+
+
+def post_author_scope(post_id):
+    username = Post.objects.filter(pk=post_id).values_list(
+        "author__username", flat=True
+    ).first()
+    return f"profile:{username}"
+
+
+POST_SCOPES = ("post:{post_id}", post_author_scope, "groups")
 
 
-@cache_page(20, key_prefix="index_page")
+@condition_versioned("index_page", INDEX_SCOPES)
+@cache_page_versioned(CACHE_TIMEOUT, "index_page", INDEX_SCOPES)
 def index(request):
     template = "posts/index.html"
-    post_list = Post.objects.all()
+    post_list = Post.objects.select_related("author", "group")
     context = {"page_obj": paginator_func(post_list, request=request),
                "index": True}
     return render(request, template, context)
 
 
+@condition_versioned("group_page", GROUP_SCOPES)
+@cache_page_versioned(CACHE_TIMEOUT, "group_page", GROUP_SCOPES)
 def group_posts(request, slug):
     template = "posts/group_list.html"
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    posts = group.posts.select_related("author", "group")
     context = {
         "group": group,
         "page_obj": paginator_func(post_list=posts, request=request),
@@ -34,10 +63,14 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@condition_versioned("profile_page", PROFILE_SCOPES)
+@cache_page_versioned(CACHE_TIMEOUT, "profile_page", PROFILE_SCOPES)
 def profile(request, username):
     template_name = "posts/profile.html"
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
+    posts = author.posts.select_related("author", "group")
     user = request.user
     following = (
         user.is_authenticated
@@ -51,15 +84,72 @@ def profile(request, username):
     return render(request, template_name, context)
 
 
+@condition_versioned("post_page", POST_SCOPES)
+@cache_page_versioned(CACHE_TIMEOUT, "post_page", POST_SCOPES)
 def post_detail(request, post_id):
     template_name = "posts/post_detail.html"
     form = CommentForm()
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"), pk=post_id
+    )
+    comments = CursorPaginator(
+        post.comments.select_related("author"), COMMENTS_COUNT,
+        field="created",
+    ).cursor_page({})
     context = {"post": post, "form": form, "comments": comments}
     return render(request, template_name, context)
 
 
+def post_comments(request, post_id):
+    template_name = "posts/includes/comments.html"
+    comments = cursor_page(CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related("author"),
+        COMMENTS_COUNT, field="created",
+    ), request.GET)
+    context = {"post_id": post_id, "comments": comments}
+    return render(request, template_name, context)
+
+
+@cache_page_versioned(CACHE_TIMEOUT, "search_page", ("index", "groups"))
+def search(request):
+    template = "posts/search.html"
+    query = request.GET.get("q", "").strip()
+    try:
+        page_obj = post_search.search_page(
+            query, request.GET, PAGINATOR_COUNT
+        )
+    except InvalidPage:
+        raise Http404("Неверный курсор")
+    context = {
+        "query": query,
+        # Ссылки пагинатора сохраняют поисковый запрос.
+        "query_string": urlencode({"q": query}) + "&",
+        "page_obj": page_obj,
+    }
+    return render(request, template, context)
+
+
+def cached_feed(feed, key_prefix, scopes):
+    """Лента с кешем страницы и ответом 304, как у HTML-страниц."""
+    return condition_versioned(key_prefix, scopes)(
+        cache_page_versioned(CACHE_TIMEOUT, key_prefix, scopes)(feed)
+    )
+
+
+index_rss = cached_feed(feeds.PostsFeed(), "index_rss", INDEX_SCOPES)
+index_atom = cached_feed(feeds.PostsAtomFeed(), "index_atom", INDEX_SCOPES)
+group_rss = cached_feed(feeds.GroupPostsFeed(), "group_rss", GROUP_SCOPES)
+group_atom = cached_feed(
+    feeds.GroupPostsAtomFeed(), "group_atom", GROUP_SCOPES
+)
+profile_rss = cached_feed(
+    feeds.AuthorPostsFeed(), "profile_rss", PROFILE_SCOPES
+)
+profile_atom = cached_feed(
+    feeds.AuthorPostsAtomFeed(), "profile_atom", PROFILE_SCOPES
+)
+
+
 @login_required
 def post_create(request):
     template_name = "posts/post_create.html"
@@ -68,6 +158,7 @@ def post_create(request):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        thumbnails.schedule(new_post)
         return redirect("posts:profile", new_post.author)
     contex = {"form": form}
     return render(request, template_name, contex)
@@ -77,12 +168,18 @@ def post_create(request):
 def post_edit(request, post_id):
     template_name = "posts/post_create.html"
     post = get_object_or_404(Post, pk=post_id)
-    if request.user != post.author:
+    if request.user.pk != post.author_id:
         return redirect("posts:post_detail", post.id)
     form = PostForm(request.POST or None, files=request.FILES or None,
                     instance=post)
     if form.is_valid():
-        form.save()
+        # Счётчики поста меняются отдельными UPDATE, поэтому сохраняются
+        # только поля формы, чтобы не затереть их устаревшими значениями.
+        form.save(commit=False).save(
+            update_fields=(*PostForm.Meta.fields, "updated")
+        )
+        if "image" in form.changed_data:
+            thumbnails.schedule(post)
         return redirect("posts:post_detail", post.id)
     context = {"form": form, "is_edit": True}
     return render(request, template_name, context)
@@ -104,11 +201,13 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     template = "posts/follow.html"
-    post_list = Post.objects.filter(
-        author__following__user=request.user,
-    ).all()
-    context = {"page_obj": paginator_func(post_list, request=request),
-               "follow": True}
+    entries = TimelineEntry.objects.filter(
+        user=request.user,
+    ).select_related("post__author", "post__group")
+    paginator = CursorPaginator(entries, PAGINATOR_COUNT, pk_field="post_id")
+    page_obj = cursor_page(paginator, request.GET)
+    page_obj.object_list = [entry.post for entry in page_obj.object_list]
+    context = {"page_obj": page_obj, "follow": True}
     return render(request, template, context)
 
 
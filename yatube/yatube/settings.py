@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import tempfile
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -42,6 +43,7 @@ INSTALLED_APPS = [
     'core.apps.CoreConfig',
     'users.apps.UsersConfig',
     'posts.apps.PostsConfig',
+    'api.apps.ApiConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -49,20 +51,72 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'sorl.thumbnail',
-    'debug_toolbar'
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware'
 ]
 
+# debug_toolbar только для разработки; в работе замеры запроса отдаёт
+# core.middleware.PerformanceMiddleware.
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
+# Строка JSON с замерами каждого запроса. При разработке её заменяет
+# debug_toolbar, поэтому лог включается только без DEBUG.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING' if DEBUG else 'INFO',
+            'propagate': False,
+        },
+        'core.slow_queries': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
+# Запросы дольше SLOW_QUERY_MS пишутся в лог core.slow_queries вместе
+# с view, местом вызова и планом (core/querylog.py).
+SLOW_QUERY_MS = 100
+# Сколько отпечатков запросов держать в топе по суммарному времени.
+QUERY_FINGERPRINTS = 200
+
+# Профили отдельных запросов (core/middleware.py, ProfilerMiddleware).
+PROFILE_DIR = os.path.join(BASE_DIR, 'profiles')
+PROFILE_INTERVAL = 0.005
+PROFILE_TOKEN_MAX_AGE = 60 * 60
+
+# Файлы метрик всех процессов для /metrics (core/metrics.py). Каталог
+# общий для воркеров одного сервера; при развёртывании его очищают.
+METRICS_DIR = os.environ.get(
+    'YATUBE_METRICS_DIR',
+    os.path.join(tempfile.gettempdir(), 'yatube-metrics'),
+)
+# /metrics отвечает только с заголовком Authorization: Bearer <токен>.
+# Без токена — лишь в режиме отладки и адресам из INTERNAL_IPS.
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN', '')
+# Тесты пишут метрики в свой временный каталог.
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
@@ -92,7 +146,34 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+    }
+}
+
+# Реплики для чтения. Локально реплика — копия основной базы в отдельном
+# файле SQLite, её обновляет `manage.py sync_replica`.
+DATABASE_REPLICAS = []
+if os.environ.get('YATUBE_REPLICA_DB'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.environ['YATUBE_REPLICA_DB'],
+        'TEST': {'MIRROR': 'default'},
     }
+    DATABASE_REPLICAS.append('replica')
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+# Сколько секунд после записи запросы пользователя читают основную базу.
+REPLICA_PIN_SECONDS = 5
+
+# Применяются к каждому новому соединению с SQLite (core/db.py).
+# WAL даёт читать во время записи, busy_timeout ждёт блокировку
+# вместо ошибки "database is locked".
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'memory',
 }
 
 
@@ -114,10 +195,32 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
-CACHES = {
-    'default': {
+# Общий уровень кеша: файловый, если задан каталог, иначе память процесса
+# (для разработки и тестов, где процесс один).
+if os.environ.get('YATUBE_SHARED_CACHE_LOCATION'):
+    SHARED_CACHE = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['YATUBE_SHARED_CACHE_LOCATION'],
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    }
+else:
+    SHARED_CACHE = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'shared',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
     }
+
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 5,
+            'SYNC_INTERVAL': 1,
+        },
+    },
+    'shared': SHARED_CACHE,
 }
 
 INTERNAL_IPS = [
@@ -150,3 +253,10 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Миниатюры картинок постов создаются в пуле потоков после сохранения.
+# С YATUBE_THUMBNAIL_SYNC=1 — сразу, в том же потоке.
+POSTS_THUMBNAIL_ASYNC = not os.environ.get('YATUBE_THUMBNAIL_SYNC')
+POSTS_THUMBNAIL_WORKERS = 2
+# Чтения миниатюр считаются для /metrics.
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
@@ -2,9 +2,14 @@ from django.contrib import admin
 from django.urls import include, path
 from django.conf import settings
 
+from core.views import metrics_view, query_stats
+
 urlpatterns = [
     path('', include('posts.urls')),
+    path('admin/query-stats/', query_stats, name='query_stats'),
+    path('metrics', metrics_view, name='metrics'),
     path('admin/', admin.site.urls),
+    path('api/v1/', include('api.urls', namespace='api')),
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),